@@ -1,17 +1,28 @@
 # app.py (GRID YAPISINI VE DİNAMİK/STATİK RENKLERİ DESTEKLEYEN SON VERSİYON)
 
 import os
-import pandas as pd
-from flask import Flask, render_template, redirect, url_for, request, session, flash, send_file
+import pyarrow as pa
+import pyarrow.parquet as pq
+from flask import Flask, Response, render_template, stream_template, redirect, url_for, request, session, flash, send_file, jsonify, get_flashed_messages
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired
 import json # JSON işlemleri için
 import uuid # Rastgele ID'ler için
-import qrcode # QR kod oluşturma için
 from io import BytesIO # Dosya yükleme/indirme için
 import urllib.parse # URL kodlama için
 from functools import wraps # Decorator'lar için
+from ingest import sniff_csv, describe_detection, csv_to_parquet, xlsx_to_parquet # Akış halinde dosya okuma
+from table_query import MAX_PAGE_LENGTH, data_columns, query_page, take_rows # Sunucu taraflı sayfalama
+from label_render import QR_RENDER_MODES, RENDER_BATCH_ROWS, iter_preview_html, qr_symbol_defs, render_print_file # Derlenmiş etiket şablonları
+from qr_cache import QRCache # QR kod oluşturma ve önbellek
+from jobs import JobQueue, JOB_QUEUED, JOB_RUNNING, JOB_DONE # Arka plan yazdırma işleri
+from arrow_cache import ArrowTableCache # İşçi başına Parquet/Arrow tablo önbelleği
+from selection import parse_ranges, save_selection, load_selection # Aralık listesi olarak satır seçimi
+from zpl_render import ZPL_DPI_CHOICES, iter_zpl # Yazıcı dili (ZPL) çıktısı
+from template_store import TemplateStore # Sunucu taraflı şablon ve veri bilgisi deposu
+from storage import StorageManager, save_upload # uploads/ kota ve temizlik yönetimi
+import metrics # İstek/aşama süreleri, /metrics ve örneklemeli profilleyici
 
 ALLOWED_EXTENSIONS = {'csv', 'xlsx'}
 
@@ -19,8 +30,75 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'cok_gizli_ve_guvenli_bir_anahtar' 
 app.config['UPLOAD_FOLDER'] = 'uploads' 
 
-if not os.path.exists(app.config['UPLOAD_FOLDER']):
-    os.makedirs(app.config['UPLOAD_FOLDER'])
+app.config['QR_CACHE_MAX_BYTES'] = 256 * 1024 * 1024 # Disk katmanı üst sınırı
+QR_CACHE_MAX_AGE = 365 * 24 * 3600
+app.config['RENDER_WORKERS'] = os.cpu_count() or 1 # Etiket render süreç havuzu boyutu
+app.config['RENDER_PARALLEL_MIN_ROWS'] = 5000 # Bunun altındaki işler istek içinde render edilir
+app.config['PRINT_PREVIEW_STREAM_MIN_ROWS'] = 2000 # Bu boyuttan büyük önizlemeler parça parça gönderilir
+app.config['JOB_WORKERS'] = 2 # Aynı anda hazırlanabilecek yazdırma işi sayısı
+app.config['ARROW_CACHE_MAX_BYTES'] = 512 * 1024 * 1024 # İşçi başına tablo önbelleği üst sınırı
+app.config['BPAC_BATCH_ROWS'] = 200 # b-PAC sayfasının tek istekte aldığı kayıt sayısı
+app.config['ZPL_DPI'] = 203 # Varsayılan yazıcı çözünürlüğü (nokta/inç)
+app.config['ZPL_LABEL_WIDTH_MM'] = 100 # Varsayılan etiket genişliği
+app.config['STORAGE_MAX_BYTES'] = 5 * 1024 ** 3 # Veri + yazdırma dosyaları için disk kotası
+app.config['STORAGE_TTL'] = 7 * 24 * 3600 # Bu süre kullanılmayan veri/yazdırma dosyaları silinir
+app.config['STORAGE_REAP_INTERVAL'] = 10 * 60 # Arka plan temizliğinin çalışma aralığı
+app.config['PROFILING_ENABLED'] = os.environ.get('NLABEL_PROFILING') == '1' # Açıkken ?_profile=1 isteği profillenir
+app.config['PROFILE_INTERVAL'] = 0.005 # Örnekleme aralığı (saniye)
+
+metrics.init_app(app)
+
+# --- Uygulama Fabrikası ---
+
+# Süreç başına servisler; create_app() kurar
+qr_cache = job_queue = arrow_cache = template_store = storage = None
+
+# UPLOAD_FOLDER altındaki yollar: açıkça verilmedikçe create_app() son UPLOAD_FOLDER'dan türetir
+UPLOAD_SUBPATHS = {
+    'QR_CACHE_FOLDER': 'qr_cache',
+    'JOBS_DB': 'jobs.sqlite3',
+    'TEMPLATE_DB': 'templates.sqlite3',
+    'PROFILE_FOLDER': 'profiles',
+}
+_derived_paths = {} # create_app'in son türettiği değerler (elle verilenlerden ayırmak için)
+
+def create_app(config=None):
+    """
+    Yapılandırmayı uygular ve süreç başına servisleri (önbellekler, iş kuyruğu, veri deposu,
+    depolama temizliği) kurar. Modül içe aktarılırken bir kez çağrılır, böylece 'gunicorn app:app'
+    değişmeden çalışır. Hiçbir iş parçacığı ya da süreç başlatmaz: bunlar ilk istekte (iş kuyruğu
+    ve render havuzu ilk işte) başlar, böylece gunicorn --preload ile ana süreçte kurulan servisler
+    çatallamadan sonra işçilerde sorunsuz çalışır.
+    """
+    global qr_cache, job_queue, arrow_cache, template_store, storage
+    if config:
+        app.config.update(config)
+    folder = app.config['UPLOAD_FOLDER']
+    for key, name in UPLOAD_SUBPATHS.items():
+        if key not in app.config or app.config[key] == _derived_paths.get(key):
+            app.config[key] = _derived_paths[key] = os.path.join(folder, name)
+    os.makedirs(folder, exist_ok=True)
+    if storage is not None:
+        storage.stop()
+
+    qr_cache = QRCache(app.config['QR_CACHE_FOLDER'], max_disk_bytes=app.config['QR_CACHE_MAX_BYTES'])
+    job_queue = JobQueue(app.config['JOBS_DB'], workers=app.config['JOB_WORKERS'])
+    arrow_cache = ArrowTableCache(max_bytes=app.config['ARROW_CACHE_MAX_BYTES'])
+    template_store = TemplateStore(app.config['TEMPLATE_DB'])
+    storage = StorageManager(app.config['UPLOAD_FOLDER'], template_store,
+                             max_bytes=app.config['STORAGE_MAX_BYTES'],
+                             ttl=app.config['STORAGE_TTL'],
+                             interval=app.config['STORAGE_REAP_INTERVAL'],
+                             on_delete=arrow_cache.discard,
+                             jobs=job_queue)
+    return app
+
+@app.before_request
+def start_background_tasks():
+    """Depolama temizliğini bu işçi sürecinde başlatır (ilk istekte; sonrakilerde işlem yapmaz)."""
+    storage.start()
+
+create_app()
 
 # --- Form ve Yardımcı Fonksiyonlar ---
 
@@ -34,6 +112,41 @@ def allowed_file(filename):
     """Desteklenen dosya uzantısı kontrolü"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def iter_file_chunks(path, chunk_size=1024 * 1024):
+    """Dosyayı sabit boyutlu metin parçaları halinde okur (akış yanıtları için)."""
+    with open(path, encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+def data_path(data_uuid):
+    """Yüklenen verinin Parquet dosyası."""
+    return os.path.join(app.config['UPLOAD_FOLDER'], f'{data_uuid}.parquet')
+
+def dataset_info(data_uuid):
+    """Yüklenen verinin sütunları ve satır sayısı; depoda kayıt yoksa Parquet üst verisinden okunup kaydedilir."""
+    info = template_store.get_dataset(data_uuid)
+    if info is None:
+        parquet_file = pq.ParquetFile(data_path(data_uuid))
+        info = {'columns': data_columns(parquet_file), 'row_count': parquet_file.metadata.num_rows}
+        template_store.save_dataset(data_uuid, info['columns'], info['row_count'])
+    return info
+
+def current_template():
+    """Oturumdaki şablon: (şablon kimliği, sürüm, hücre listesi). Oturumda yalnızca kimlik tutulur."""
+    template_id = session.get('template_id')
+    if template_id is None:
+        return None, 0, []
+    version, template_rows = template_store.get_template(template_id)
+    return template_id, version, template_rows
+
+def save_current_template(template_rows):
+    """Şablonun yeni sürümünü depoya yazar; oturumda şablon yoksa yenisini oluşturur."""
+    template_id, _ = template_store.save_template(session.get('template_id'), template_rows)
+    session['template_id'] = template_id
+
 def login_required(f):
     """Giriş kontrol decorator'ı"""
     @wraps(f)
@@ -53,18 +166,18 @@ def generate_qrcode(data_to_encode):
     # Güvenlik ve Türkçe karakter desteği için decode/unquote
     qr_data = urllib.parse.unquote(data_to_encode) 
     try:
-        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=4, border=4)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
-        return send_file(buffer, mimetype='image/png')
+        key, png = qr_cache.get(qr_data)
     except Exception as e:
         # Hata durumunda boş 204 döner (resim yüklenmez)
         return "", 204 
 
+    # İçerik adresli: aynı adres her zaman aynı görüntüyü verir, tarayıcı uzun süre saklayabilir
+    response = send_file(BytesIO(png), mimetype='image/png', etag=key, max_age=QR_CACHE_MAX_AGE)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
 # --- Rota Tanımlamaları ---
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -104,51 +217,49 @@ def upload():
             filename = file.filename
             temp_filename = str(uuid.uuid4()) + "_" + filename 
             filepath = os.path.join(app.config['UPLOAD_FOLDER'], temp_filename)
+            data_uuid = str(uuid.uuid4())
+            parquet_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{data_uuid}.parquet')
             
             try:
-                file.save(filepath)
-                df = None
-                
-                # CSV/XLSX okuma denemeleri
+                content_hash = save_upload(file, filepath)
+
+                # Aynı içerik daha önce yüklendiyse mevcut Parquet kullanılır, dosya yeniden okunmaz
+                existing_uuid = template_store.find_dataset(content_hash)
+                if existing_uuid and os.path.exists(data_path(existing_uuid)):
+                    os.remove(filepath)
+                    template_store.touch_dataset(existing_uuid)
+                    info = dataset_info(existing_uuid)
+                    session.clear()
+                    session['logged_in'] = True
+                    session['data_uuid'] = existing_uuid
+                    flash(f'Dosya "{filename}" daha önce yüklenmiş; mevcut veri kullanılıyor ({info["row_count"]} satır, {len(info["columns"])} sütun).', 'success')
+                    return redirect(url_for('table_view'))
+
+                # Dosya parça parça okunup doğrudan Parquet'e yazılır (bellek kullanımı sabit kalır)
+                detection_note = ''
                 if filename.endswith('.csv'):
-                    denemeler = [
-                        ('utf-8', '\t'), ('cp1254', '\t'), ('latin1', '\t'),
-                        ('utf-8', ','), ('latin1', ';'), ('cp1254', ';'),
-                        ('utf-8', ';'), ('latin1', ','), ('cp1254', ','),
-                    ]
-                    MIN_EXPECTED_COLUMNS = 2 
-                    for encoding, sep in denemeler:
-                        try:
-                            temp_df = pd.read_csv(filepath, encoding=encoding, sep=sep, dtype=str, keep_default_na=False)
-                            if len(temp_df.columns) >= MIN_EXPECTED_COLUMNS:
-                                df = temp_df
-                                break
-                        except Exception:
-                            continue
-                    
-                    if df is None:
-                        raise Exception("CSV okuma hatası: Geçerli bir kodlama veya ayırıcı bulunamadı.")
-                else: 
-                    df = pd.read_excel(filepath, dtype=str, keep_default_na=False)
-                
-                # Veriyi Parquet'e kaydetme
-                data_uuid = str(uuid.uuid4())
-                parquet_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{data_uuid}.parquet')
-                df.to_parquet(parquet_path)
+                    # Örnekten kodlama/ayırıcı tespiti, ardından tek geçişte akış halinde okuma
+                    detection = sniff_csv(filepath)
+                    columns, row_count = csv_to_parquet(filepath, parquet_path, detection)
+                    detection_note = f', {describe_detection(detection)}'
+                    app.logger.info('CSV tespiti %s: %s', filename, detection)
+                else:
+                    columns, row_count = xlsx_to_parquet(filepath, parquet_path)
 
                 # Session'ı güncelle
                 session.clear()
                 session['logged_in'] = True 
                 session['data_uuid'] = data_uuid
-                session['dataframe_columns'] = list(df.columns)
+                template_store.save_dataset(data_uuid, columns, row_count, content_hash)
                 
                 os.remove(filepath)
                 
-                flash(f'Dosya "{filename}" başarıyla yüklendi ({len(df.columns)} sütun bulundu).', 'success')
+                flash(f'Dosya "{filename}" başarıyla yüklendi ({row_count} satır, {len(columns)} sütun bulundu{detection_note}).', 'success')
                 return redirect(url_for('table_view'))
                 
             except Exception as e:
                 if os.path.exists(filepath): os.remove(filepath)
+                if os.path.exists(parquet_path): os.remove(parquet_path)
                 error_message = str(e)
                 flash(f'Dosya okuma hatası: {error_message}', 'danger')
                 return redirect(request.url)
@@ -170,52 +281,121 @@ def table_view():
     data_uuid = session['data_uuid']
     parquet_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{data_uuid}.parquet')
     
-    try:
-        df = pd.read_parquet(parquet_path)
-    except FileNotFoundError:
+    if not os.path.exists(parquet_path):
         flash('Veri dosyası bulunamadı. Lütfen tekrar yükleyin.', 'danger')
         return redirect(url_for('upload'))
     
-    template_set = 'label_template_rows' in session and session.get('label_template_rows') is not None and len(session.get('label_template_rows')) > 0
+    template_id, template_version, template_rows = current_template()
+    template_set = len(template_rows) > 0
+    info = dataset_info(data_uuid)
+    template_store.touch_dataset(data_uuid) # Depolama temizliğinde LRU sırası için
     
     if request.method == 'POST':
         if not template_set:
             flash('Lütfen yazdırma işlemine geçmeden önce Etiket Şablonunu ayarlayın.', 'warning')
             return redirect(url_for('template_design'))
             
-        selected_rows_indices = request.form.getlist('selected_rows')
-        if not selected_rows_indices:
+        # Seçim "0-99,150" gibi aralık listesi olarak gelir; eski tek tek satır alanları da kabul edilir
+        try:
+            selected_indices = parse_ranges(request.form.get('selected_ranges')
+                                            or ','.join(request.form.getlist('selected_rows')),
+                                            row_count=info['row_count'])
+        except IndexError:
+            flash('Seçilen satırlar veri dosyasıyla uyuşmuyor. Lütfen tekrar seçin.', 'danger')
+            return redirect(url_for('table_view'))
+        except ValueError:
+            flash('Satır seçimi okunamadı. Lütfen tekrar seçin.', 'danger')
+            return redirect(url_for('table_view'))
+        if not len(selected_indices):
             flash('Yazdırmak için en az bir satır seçmelisiniz.', 'warning')
             return redirect(url_for('table_view'))
             
-        selected_df = df.iloc[[int(i) for i in selected_rows_indices]]
-        
+        # Seçim, QR ön üretimi ve etiket render'ı arka plan işinde yapılır; istek hemen döner
         print_uuid = str(uuid.uuid4())
-        print_parquet_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{print_uuid}_print.parquet')
-        selected_df.to_parquet(print_parquet_path)
+        job_id = job_queue.submit('print', prepare_print_job,
+                                  data_uuid=data_uuid,
+                                  print_uuid=print_uuid,
+                                  selected_indices=selected_indices,
+                                  template_rows=template_rows,
+                                  template_version=(template_id, template_version),
+                                  qr_url_prefix=url_for('generate_qrcode', data_to_encode='_')[:-1])
         
         session['print_uuid'] = print_uuid
+        session['print_job_id'] = job_id
         
-        flash(f'{len(selected_rows_indices)} adet satır yazdırmaya hazır. Önizleme sayfasına yönlendiriliyorsunuz.', 'info')
-        return redirect(url_for('print_preview'))
+        flash(f'{len(selected_indices)} adet satır yazdırmaya hazırlanıyor.', 'info')
+        return redirect(url_for('print_job'))
 
+    # Satırlar sayfaya gömülmez; tablo table_data rotasından sayfa sayfa yüklenir
     return render_template('table_view.html', 
-                           columns=df.columns.tolist(), 
-                           data=df.values.tolist(),
-                           data_json=df.to_json(orient='records'),
+                           columns=info['columns'], 
                            template_set=template_set)
 
 
+@app.route('/table/data')
+@login_required
+def table_data():
+    """DataTables sunucu taraflı işleme: tek sayfa satırı sıralanmış/filtrelenmiş olarak JSON döndürür."""
+    if 'data_uuid' not in session:
+        return jsonify({'error': 'Veri yüklenmedi.'}), 404
+
+    parquet_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{session['data_uuid']}.parquet")
+    if not os.path.exists(parquet_path):
+        return jsonify({'error': 'Veri dosyası bulunamadı.'}), 404
+
+    columns = data_columns(pq.ParquetFile(parquet_path))
+    args = request.args
+
+    # DataTables'ın 0. sütunu seçim kutusudur; veri sütunları 1'den başlar
+    column_filters = {}
+    for i, name in enumerate(columns, start=1):
+        value = args.get(f'columns[{i}][search][value]', '')
+        if value:
+            column_filters[name] = value
+
+    order = None
+    order_index = args.get('order[0][column]', type=int)
+    if order_index and 1 <= order_index <= len(columns):
+        order = (columns[order_index - 1], args.get('order[0][dir]', 'asc'))
+
+    # Önbellekte yoksa tablo yalnızca filtre/sıralama tüm satırları taramayı gerektiriyorsa istek
+    # içinde okunur (sınıra sığıyorsa); düz sayfalamada sayfa row group bazlı okunur ve tablo
+    # sonraki istekler için arka planda önbelleğe alınır
+    search = args.get('search[value]', '')
+    table = arrow_cache.peek(parquet_path)
+    if table is None:
+        if column_filters or search.strip() or order:
+            table = arrow_cache.get(parquet_path, load_if_larger=False)
+        else:
+            arrow_cache.load_in_background(parquet_path)
+
+    page = query_page(parquet_path,
+                      start=args.get('start', 0, type=int),
+                      length=args.get('length', 50, type=int),
+                      search=search,
+                      column_filters=column_filters,
+                      order=order,
+                      table=table)
+
+    return jsonify({
+        'draw': args.get('draw', 0, type=int),
+        'recordsTotal': page['total'],
+        'recordsFiltered': page['filtered'],
+        # İlk eleman kaynak veri içindeki satır numarasıdır (seçim kutusunun değeri)
+        'data': [[index] + row for index, row in zip(page['indices'], page['rows'])],
+    })
+
+
 @app.route('/template_design', methods=['GET', 'POST'])
 @login_required
 def template_design():
     """Etiket Şablonu Tasarım Sayfası (GRID ve Hücre Birleştirmeyi Kullanır)"""
-    if 'dataframe_columns' not in session:
+    if 'data_uuid' not in session or not os.path.exists(data_path(session['data_uuid'])):
         flash('Lütfen önce bir dosya yükleyin.', 'warning')
         return redirect(url_for('upload'))
         
-    data_columns = session.get('dataframe_columns', [])
-    current_template_rows = session.get('label_template_rows', [])
+    data_columns = dataset_info(session['data_uuid'])['columns']
+    _, _, current_template_rows = current_template()
 
     if request.method == 'POST':
         action = request.form.get('action')
@@ -270,6 +450,10 @@ def template_design():
                 col_name = request.form.get('dynamic_col_name')
                 if col_name in data_columns:
                     item['name'] = col_name
+                    if item_type == 'qrcode':
+                        # QR çizim biçimi: image (PNG isteği), svg (satır içi), symbol (tekrar eden değerler tek tanım)
+                        qr_render = request.form.get('qr_render', 'image')
+                        item['qr_render'] = qr_render if qr_render in QR_RENDER_MODES else 'image'
                 else:
                     flash(f"Hata: Dinamik alan için geçerli bir sütun adı seçilmedi: {col_name}", 'danger')
                     return redirect(url_for('template_design'))
@@ -277,12 +461,12 @@ def template_design():
                 item['name'] = request.form.get('image_logo_url', '/static/logo.png')
             
             current_template_rows.append(item)
-            session['label_template_rows'] = current_template_rows
+            save_current_template(current_template_rows)
             flash("Yeni hücre şablona eklendi.", 'success')
             return redirect(url_for('template_design'))
 
         elif action == 'clear_template':
-            session.pop('label_template_rows', None)
+            save_current_template([])
             flash("Şablon başarıyla temizlendi.", 'info')
             return redirect(url_for('template_design'))
         
@@ -314,7 +498,7 @@ def template_design():
                 if not new_template_rows:
                     flash('İçe aktarılan JSON dosyası geçerli bir şablon içermiyor.', 'danger')
                     return redirect(url_for('template_design'))
-                session['label_template_rows'] = new_template_rows
+                save_current_template(new_template_rows)
                 flash('Şablon başarıyla içe aktarıldı.', 'success')
                 return redirect(url_for('template_design'))
             except Exception as e:
@@ -327,7 +511,7 @@ def template_design():
                 current_template_rows[row_index], current_template_rows[row_index - 1] = current_template_rows[row_index - 1], current_template_rows[row_index]
             elif action == 'move_down' and row_index < len(current_template_rows) - 1:
                 current_template_rows[row_index], current_template_rows[row_index + 1] = current_template_rows[row_index + 1], current_template_rows[row_index]
-            session['label_template_rows'] = current_template_rows
+            save_current_template(current_template_rows)
             flash("Hücre sırası güncellendi.", 'info')
             return redirect(url_for('template_design'))
         
@@ -335,7 +519,7 @@ def template_design():
             row_index = int(request.form.get('row_index'))
             if 0 <= row_index < len(current_template_rows):
                 current_template_rows.pop(row_index)
-                session['label_template_rows'] = current_template_rows
+                save_current_template(current_template_rows)
                 flash("Hücre şablondan silindi.", 'danger')
             return redirect(url_for('template_design'))
 
@@ -344,28 +528,174 @@ def template_design():
                            data_columns=data_columns,
                            current_template_rows=current_template_rows)
 
+# --- Yazdırma İşleri (Arka Plan) ---
+
+def print_paths(print_uuid):
+    """Yazdırma işinin seçim dosyası (kaynak veri + satır aralıkları) ve önceden render edilmiş etiket dosyası."""
+    folder = app.config['UPLOAD_FOLDER']
+    return os.path.join(folder, f'{print_uuid}_selection.json'), os.path.join(folder, f'{print_uuid}_labels.html')
+
+def load_print_selection():
+    """Oturumdaki yazdırma işinin (veri kimliği, seçili satırlar) bilgisi; seçim ya da veri dosyası yoksa None."""
+    if 'print_uuid' not in session:
+        return None
+    selection_path, _ = print_paths(session['print_uuid'])
+    try:
+        data_uuid, selected_indices = load_selection(selection_path)
+    except FileNotFoundError:
+        return None
+    if not os.path.exists(data_path(data_uuid)):
+        return None
+    return data_uuid, selected_indices
+
+def prepare_print_job(job, data_uuid, print_uuid, selected_indices, template_rows, template_version, qr_url_prefix):
+    """
+    Arka plan işi: seçimi aralık listesi olarak kaydeder, PNG QR'ları önceden üretir ve
+    etiket HTML'ini dosyaya render eder. Seçilen satırlar kaynak Parquet'ten okunur; kopyası yazılmaz.
+    """
+    selection_path, labels_path = print_paths(print_uuid)
+    parquet_path = data_path(data_uuid)
+
+    # 1. Seçim
+    job.update(progress=0, total=100, message='Seçilen satırlar hazırlanıyor')
+    save_selection(selection_path, data_uuid, selected_indices)
+
+    # 2. QR ön üretimi (yalnızca PNG isteği yapan 'image' biçimindeki hücreler için)
+    qr_columns = [item.get('name') for item in template_rows
+                  if item.get('type') == 'qrcode' and item.get('qr_render', 'image') == 'image']
+    available = dataset_info(data_uuid)['columns']
+    qr_columns = [name for name in dict.fromkeys(qr_columns) if name in available]
+    qr_values = []
+    if qr_columns:
+        # Önbellekte ya da önbelleğe sığıyorsa tablo, değilse yalnızca QR sütunlarının gerekli row group'ları
+        table = arrow_cache.get(parquet_path, load_if_larger=False)
+        if table is not None:
+            selected = table.select(qr_columns).take(pa.array(selected_indices))
+        else:
+            selected = take_rows(pq.ParquetFile(parquet_path), selected_indices, columns=qr_columns)
+        qr_values = [str(value) for name in qr_columns for value in selected.column(name).to_pylist()]
+        del selected, table
+    if qr_values:
+        job.update(progress=10, message='QR kodlar üretiliyor')
+        qr_cache.pregenerate(qr_values, on_progress=lambda done, total: job.update(progress=10 + 40 * done // total))
+
+    # 3. Etiket render'ı (geçici dosyaya yazıp tamamlanınca yerine taşı)
+    job.update(progress=50, message='Etiketler oluşturuluyor')
+    batch_count = -(-len(selected_indices) // RENDER_BATCH_ROWS)
+    temp_path = labels_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        batches = iter_preview_html(parquet_path, template_rows, qr_url_prefix, indices=selected_indices,
+                                    template_version=template_version,
+                                    workers=app.config['RENDER_WORKERS'],
+                                    min_parallel_rows=app.config['RENDER_PARALLEL_MIN_ROWS'])
+        for i, html in enumerate(batches, start=1):
+            f.write(html)
+            job.update(progress=50 + 50 * i // max(batch_count, 1))
+    os.replace(temp_path, labels_path)
+
+    job.update(progress=100, message='Hazır')
+    return {'rows': len(selected_indices), 'template_version': list(template_version)}
+
+def pending_print_job():
+    """Oturumdaki yazdırma işi hâlâ sürüyorsa iş kaydını döndürür."""
+    job = job_queue.get(session['print_job_id']) if 'print_job_id' in session else None
+    return job if job and job['status'] in (JOB_QUEUED, JOB_RUNNING) else None
+
+@app.route('/print_job')
+@login_required
+def print_job():
+    """Yazdırma işinin ilerlemesini gösterir; iş bitince önizlemeye yönlendirir."""
+    job = job_queue.get(session['print_job_id']) if 'print_job_id' in session else None
+    if job is None:
+        flash('Hazırlanan bir yazdırma işi bulunamadı.', 'warning')
+        return redirect(url_for('table_view'))
+    return render_template('print_job.html', job=job)
+
+@app.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """İş durumu (kuyrukta/çalışıyor/bitti/başarısız) ve ilerleme yüzdesi."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'İş bulunamadı.'}), 404
+    return jsonify({key: job[key] for key in ('id', 'status', 'progress', 'total', 'message')})
+
+# --- Depolama ---
+
+@app.route('/storage/stats')
+@login_required
+def storage_stats():
+    """uploads/ disk kullanımı (veri, yazdırma işi, yarım yükleme dosyaları) ve bu işçinin tablo önbelleği."""
+    stats = storage.stats()
+    stats['arrow_cache'] = arrow_cache.stats()
+    return jsonify(stats)
+
+# --- İzleme ---
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Bu işçinin istek ve aşama metrikleri (Prometheus metin biçimi); toplayıcı giriş yapmadan okur."""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 # --- bPac Rotası ---
+
 @app.route('/bpac_label', methods=['GET'])
 @login_required
 def bpac_label():
-    """Brother b-PAC Etiket Yazdırma Sayfası"""
+    """Brother b-PAC Etiket Yazdırma Sayfası (kayıtlar bpac_records rotasından parça parça alınır)"""
     # print_uuid kontrolü: yazdırılacak veri var mı
     if 'print_uuid' not in session:
         flash('Yazdırılacak veri bulunamadı. Lütfen önce tablo üzerinden satır seçin.', 'warning')
         return redirect(url_for('table_view'))
 
-    print_uuid = session['print_uuid']
-    parquet_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{print_uuid}_print.parquet')
-    
-    if not os.path.exists(parquet_path):
+    if pending_print_job():
+        return redirect(url_for('print_job'))
+
+    selection = load_print_selection()
+    if selection is None:
         flash('Yazdırılacak veri dosyası bulunamadı.', 'danger')
         return redirect(url_for('table_view'))
+    data_uuid, selected_indices = selection
+    template_store.touch_dataset(data_uuid)
     
-    df = pd.read_parquet(parquet_path)
-    columns = df.columns.tolist()
-    data_json = df.to_json(orient='records', force_ascii=False)
-    
-    return render_template('bpac_label.html', columns=columns, data_json=data_json)
+    return render_template('bpac_label.html',
+                           columns=dataset_info(data_uuid)['columns'],
+                           total=len(selected_indices),
+                           print_uuid=session['print_uuid'],
+                           batch_size=app.config['BPAC_BATCH_ROWS'])
+
+@app.route('/bpac_label/records')
+@login_required
+def bpac_records():
+    """
+    Yazdırma kayıtlarını imleçle sayfalayarak döndürür: ?cursor=<başlangıç sırası>&limit=<kayıt sayısı>
+    Dönüş: {'records', 'cursor', 'next_cursor' (son sayfada null), 'total'}
+    """
+    selection = load_print_selection()
+    if selection is None:
+        return jsonify({'error': 'Yazdırılacak veri bulunamadı.'}), 404
+    data_uuid, selected_indices = selection
+
+    cursor = max(0, request.args.get('cursor', 0, type=int))
+    limit = max(1, min(request.args.get('limit', app.config['BPAC_BATCH_ROWS'], type=int), MAX_PAGE_LENGTH))
+    batch_indices = selected_indices[cursor:cursor + limit]
+
+    columns = dataset_info(data_uuid)['columns']
+    parquet_path = data_path(data_uuid)
+    # Yalnızca bu sayfanın satırları gerekir: önbellekte yoksa tüm dosya istek içinde çözülmez,
+    # satırlar row group bazlı okunur ve tablo sonraki sayfalar için arka planda önbelleğe alınır
+    table = arrow_cache.peek(parquet_path)
+    if table is not None:
+        batch = table.select(columns).take(pa.array(batch_indices))
+    else:
+        arrow_cache.load_in_background(parquet_path)
+        batch = take_rows(pq.ParquetFile(parquet_path), batch_indices, columns=columns)
+
+    next_cursor = cursor + len(batch_indices)
+    return jsonify({'records': batch.to_pylist(),
+                    'cursor': cursor,
+                    'next_cursor': next_cursor if next_cursor < len(selected_indices) else None,
+                    'total': len(selected_indices)})
 
 
 @app.route('/print_preview')
@@ -376,111 +706,83 @@ def print_preview():
         flash('Yazdırılacak veri bulunamadı.', 'warning')
         return redirect(url_for('table_view'))
         
-    print_uuid = session['print_uuid']
-    print_parquet_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{print_uuid}_print.parquet')
+    if pending_print_job():
+        return redirect(url_for('print_job'))
+
+    _, labels_path = print_paths(session['print_uuid'])
     
-    try:
-        print_df = pd.read_parquet(print_parquet_path)
-    except FileNotFoundError:
+    selection = load_print_selection()
+    if selection is None:
         flash('Yazdırma için seçilen veri dosyası bulunamadı.', 'danger')
         return redirect(url_for('table_view'))
+    data_uuid, selected_indices = selection
+    parquet_path = data_path(data_uuid)
+    template_store.touch_dataset(data_uuid)
 
-    # Şablonu al (Düz hücre listesi)
-    template_rows = session.get('label_template_rows', [])
+    # Şablonu al (Düz hücre listesi, sunucu taraflı depodan)
+    template_id, template_version, template_rows = current_template()
     if not template_rows:
         flash('Yazdırılacak şablon bulunamadı. Lütfen önce şablonu ayarlayın.', 'danger')
         return redirect(url_for('template_design'))
 
-    labels = []
+    # Arka plan işi etiketleri şablonun bu sürümüyle önceden render ettiyse dosya olduğu gibi gönderilir
+    job = job_queue.get(session['print_job_id']) if 'print_job_id' in session else None
+    if (job and job['status'] == JOB_DONE and job['result'].get('template_version') == [template_id, template_version]
+            and os.path.exists(labels_path)):
+        return stream_template('print_preview.html', label_batches=iter_file_chunks(labels_path),
+                               flashed_messages=get_flashed_messages(with_categories=True))
+
+    # Şablon sürüm başına bir kez derlenir; satır başına yalnızca sütun değerleri yerleştirilir.
+    # Seçili satırlar kaynak Parquet'ten okunur; büyük işlerde parçalar süreç havuzunda paralel işlenir.
+    qr_url_prefix = url_for('generate_qrcode', data_to_encode='_')[:-1]
+    render_options = dict(indices=selected_indices, template_version=(template_id, template_version), workers=app.config['RENDER_WORKERS'], min_parallel_rows=app.config['RENDER_PARALLEL_MIN_ROWS'])
+
+    if len(selected_indices) >= app.config['PRINT_PREVIEW_STREAM_MIN_ROWS']:
+        # Akış modu: sayfa başı hemen gönderilir, etiketler parça parça yazılır
+        label_batches = iter_preview_html(parquet_path, template_rows, qr_url_prefix, **render_options)
+        # Gövde üretilirken oturum artık kaydedilemez; mesajlar şimdi okunup tüketilir
+        return stream_template('print_preview.html', label_batches=label_batches,
+                               flashed_messages=get_flashed_messages(with_categories=True))
+
+    labels, qr_symbol_values = render_print_file(parquet_path, template_rows, qr_url_prefix, **render_options)
     
-    for index, row in print_df.iterrows():
-        label_content = f"""
-        <div class="etiket-kutu">
-            <div class="etiket-grid">
-        """
-        
-        for item in template_rows:
-            item_type = item.get('type')
-            col_span = item.get('col_span', 1)
-            row_span = item.get('row_span', 1)
-            height_val = item.get('height_val', '40px')
-            font_size = item.get('size', '12px')
-            
-            # Stil Ayarlarını Al
-            bold_style = 'font-weight: bold;' if item.get('bold') else ''
-            italic_style = 'font-style: italic;' if item.get('italic') else ''
-            
-            # *** RENK YÖNETİMİ ***
-            # 1. Arkaplan Rengi (Dinamik > Statik > Varsayılan)
-            bgcolor_col = item.get('bgcolor_col')
-            bg_color_value = row.get(bgcolor_col, None) if bgcolor_col else None
-            static_bgcolor = item.get('static_bgcolor', '')
-            
-            bg_color = bg_color_value if bg_color_value else (static_bgcolor if static_bgcolor else 'transparent')
-            # Güvenlik kontrolü
-            bg_color = bg_color if bg_color.startswith('#') or bg_color.lower() in ['red', 'blue', 'yellow', 'green', 'transparent', 'white', 'black'] else 'transparent'
+    # print_preview.html şablonunu kullan
+    return render_template('print_preview.html', label_batches=[qr_symbol_defs(qr_symbol_values) + '\n'.join(labels)])
 
 
-            # 2. Yazı Rengi (Dinamik > Statik > Varsayılan)
-            textcolor_col = item.get('textcolor_col')
-            text_color_value = row.get(textcolor_col, None) if textcolor_col else None
-            static_textcolor = item.get('static_textcolor', '')
-            
-            text_color = text_color_value if text_color_value else (static_textcolor if static_textcolor else '#000')
-            # Güvenlik kontrolü
-            text_color = text_color if text_color.startswith('#') or text_color.lower() in ['red', 'blue', 'yellow', 'green', 'transparent', 'white', 'black'] else '#000'
-            
-            # CSS Grid için span değerlerini ayarla
-            grid_style = f"grid-column: span {col_span}; grid-row: span {row_span}; min-height: {height_val};"
-            
-            # Hücre stili
-            cell_style = f"background-color: {bg_color}; color: {text_color}; {bold_style} {italic_style}"
-            
-            # Etiket Hücresi
-            label_content += f'<div class="label-cell" style="{grid_style} {cell_style}">'
+# --- Yazıcı Dili Çıktısı ---
+@app.route('/print_zpl')
+@login_required
+def print_zpl():
+    """
+    Yazdırma işinin tüm etiketlerini tek bir ZPL dosyası olarak indirir (?dpi=203|300|600&width_mm=100).
+    Dosya parça parça üretilir; doğrudan yazıcıya gönderilebilir.
+    """
+    if pending_print_job():
+        return redirect(url_for('print_job'))
+
+    selection = load_print_selection()
+    if selection is None:
+        flash('Yazdırma için seçilen veri dosyası bulunamadı.', 'danger')
+        return redirect(url_for('table_view'))
+    data_uuid, selected_indices = selection
 
-            # --- İçerik Oluşturma ---
-            
-            common_text_style = f'margin: 0; padding: 0; word-break: break-all; white-space: normal; line-height: 1.2; font-size: {font_size};'
-            
-            if item_type == 'static_text':
-                content = item.get('content', '')
-                label_content += f'<div style="text-align: center; {common_text_style}">{content}</div>'
-            
-            elif item_type == 'image_logo':
-                url = item.get('name', '')
-                label_content += f'<div style="text-align: center;"><img src="{url}" alt="Logo" style="max-height: 100%; width: auto; max-width: 100%; display: inline-block;"></div>'
-            
-            elif item_type == 'qrcode':
-                column_name = item.get('name')
-                data_value = str(row.get(column_name, 'VERİ YOK')) 
-                encoded_data = urllib.parse.quote(data_value, safe='')
-                qr_code_url = url_for('generate_qrcode', data_to_encode=encoded_data)
-                
-                label_content += f'''
-                    <div style="text-align: center; padding: 5px; height: 100%;">
-                        <img src="{qr_code_url}" alt="QR Kod: {data_value}" style="max-height: 100%; width: auto; max-width: 100%; display: block; margin: 0 auto;">
-                    </div>
-                '''
-
-            elif item_type in ('text', 'barcode_text'):
-                column_name = item.get('name')
-                data_value = str(row.get(column_name, 'VERİ YOK')) 
-                
-                text_align = 'left'
-                if item_type == 'barcode_text':
-                    text_align = 'center'
-                    
-                label_content += f'<div style="text-align: {text_align}; {common_text_style}">{data_value}</div>'
-            
-            label_content += '</div>' # label-cell kapat
-        
-        label_content += '</div>' # etiket-grid kapat
-        label_content += '</div>' # etiket-kutu kapat
-        labels.append(label_content)
-    
-    # print_preview.html şablonunu kullan
-    return render_template('print_preview.html', labels=labels)
+    _, _, template_rows = current_template()
+    if not template_rows:
+        flash('Yazdırılacak şablon bulunamadı. Lütfen önce şablonu ayarlayın.', 'danger')
+        return redirect(url_for('template_design'))
+
+    dpi = request.args.get('dpi', app.config['ZPL_DPI'], type=int)
+    if dpi not in ZPL_DPI_CHOICES:
+        dpi = app.config['ZPL_DPI']
+    width_mm = request.args.get('width_mm', app.config['ZPL_LABEL_WIDTH_MM'], type=float)
+    if not 10 <= width_mm <= 300:
+        width_mm = app.config['ZPL_LABEL_WIDTH_MM']
+
+    template_store.touch_dataset(data_uuid)
+    chunks = iter_zpl(data_path(data_uuid), template_rows, indices=selected_indices, dpi=dpi, width_mm=width_mm)
+    return Response(chunks, mimetype='text/plain',
+                    headers={'Content-Disposition': 'attachment; filename=etiketler.zpl'})
 
 
 #    if __name__ == '__main__':
@@ -0,0 +1,106 @@
+# arrow_cache.py (İŞÇİ BAŞINA ARROW TABLO ÖNBELLEĞİ)
+
+import os
+import threading
+from collections import OrderedDict
+import pyarrow.parquet as pq
+from metrics import span
+
+
+class ArrowTableCache:
+    """
+    Parquet dosyalarından okunan Arrow tablolarını süreç içinde saklar.
+    Anahtar (yol, mtime, boyut) olduğundan dosya değişince eski kayıt kendiliğinden geçersiz olur.
+    Toplam boyut max_bytes'ı aşınca en uzun süredir kullanılmayan tablolar atılır.
+    gunicorn iş parçacıkları arasında güvenlidir.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._tables = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loading = set() # Arka planda okunmakta olan yollar
+
+    @staticmethod
+    def _key(path):
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    def peek(self, path):
+        """Tablo önbellekteyse döndürür, değilse None; diski hiç okumaz. Dosya yoksa FileNotFoundError."""
+        key = self._key(path)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+            return table
+
+    def load_in_background(self, path):
+        """
+        Tabloyu istek dışında, bir arka plan iş parçacığında önbelleğe alır (sınıra sığıyorsa).
+        Aynı dosya için aynı anda tek okuma yapılır; hatalar (ör. dosya silinmiş) yok sayılır.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            if path in self._loading:
+                return
+            self._loading.add(path)
+
+        def load():
+            try:
+                self.get(path, load_if_larger=False)
+            except OSError:
+                pass
+            finally:
+                with self._lock:
+                    self._loading.discard(path)
+
+        threading.Thread(target=load, name='arrow-cache-load', daemon=True).start()
+
+    def get(self, path, load_if_larger=True):
+        """
+        Tabloyu önbellekten ya da (bellek eşlemeli okuma ile) diskten döndürür.
+        Tek başına sınırı aşan tablolar okunur ama saklanmaz; load_if_larger=False ise
+        bu durumda hiç okunmaz ve None döner (çağıran row group bazlı okumaya geçer).
+        Dosya yoksa FileNotFoundError.
+        """
+        table = self.peek(path)
+        if table is not None:
+            return table
+        key = self._key(path)
+
+        if not load_if_larger:
+            metadata = pq.ParquetFile(path).metadata
+            estimated = sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+            if estimated > self.max_bytes:
+                return None
+
+        with span('parquet_read') as measured:
+            table = pq.read_table(path, memory_map=True)
+            measured.rows, measured.bytes = table.num_rows, table.nbytes
+        if table.nbytes > self.max_bytes:
+            return table
+
+        with self._lock:
+            if key not in self._tables:
+                # Aynı dosyanın eski sürümlerini de bırak
+                for old_key in [k for k in self._tables if k[0] == key[0]]:
+                    self._bytes -= self._tables.pop(old_key).nbytes
+                self._tables[key] = table
+                self._bytes += table.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._tables.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return table
+
+    def discard(self, path):
+        """Dosyanın (tüm sürümlerinin) önbellekteki tablolarını bırakır; dosya silindiğinde çağrılır."""
+        path = os.path.abspath(path)
+        with self._lock:
+            for key in [k for k in self._tables if k[0] == path]:
+                self._bytes -= self._tables.pop(key).nbytes
+
+    def stats(self):
+        with self._lock:
+            return {'tables': len(self._tables), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
@@ -0,0 +1,427 @@
+# bench.py (SENTETİK VERİ İLE UÇTAN UCA PERFORMANS ÖLÇÜMÜ)
+"""
+Sabit tohumla (seed) üretilen CSV/XLSX verilerini Flask test istemcisi üzerinden
+upload, table_view, table_data, yazdırma işi, print_preview, print_zpl ve generate_qrcode
+rotalarından geçirir; süre yüzdelikleri, verim ve tepe bellek değerlerini JSON olarak yazar.
+Uygulamanın içe aktarılma (işçi açılışı) ve ısınma süreleri ayrı süreçlerde ölçülür.
+
+Kullanım (depo kök dizininden):
+    python benchmarks/bench.py                         # 1k ve 10k satır, hızlı tur
+    python benchmarks/bench.py --sizes 1000,100000,1000000 --output sonuc.json
+    python benchmarks/bench.py --compare eski.json yeni.json
+
+Her çalıştırma geçici bir klasörde, boş bir uploads/ ile yapılır. Sonuçlar aynı makinede
+alınan ölçümlerle karşılaştırılmalıdır.
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+from importlib import metadata
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED = 20240601
+
+WORDS = ['çilek', 'şeker', 'ığdır', 'göz', 'ürün', 'kalem', 'defter', 'İstanbul', 'Ağrı', 'öğrenci',
+         'masa', 'sandalye', 'kutu', 'etiket', 'yazıcı', 'kağıt', 'mürekkep', 'dolap', 'raf', 'çanta']
+COLORS = ['#ff0000', '#0a0', 'navy', 'rgb(10, 20, 30)', 'lightgray', 'geçersiz', '', '#FFCC00']
+
+# Aynı rota kümesini farklı biçimlerde deneyen veri setleri: (ad, uzantı, kodlama, ayırıcı, genişlik)
+DATASET_VARIANTS = [
+    ('csv_utf8_comma_narrow', 'csv', 'utf-8', ',', 'narrow'),
+    ('csv_cp1254_semicolon_narrow', 'csv', 'cp1254', ';', 'narrow'),
+    ('csv_utf8_tab_wide', 'csv', 'utf-8', '\t', 'wide'),
+    ('xlsx_narrow', 'xlsx', None, None, 'narrow'),
+]
+WIDE_EXTRA_COLUMNS = 60
+XLSX_MAX_ROWS = 100_000 # openpyxl ile daha büyük XLSX üretmek ölçümden uzun sürer
+
+# Temsilî şablonlar (template_design'ın add_cell ile ürettiği hücre biçiminde)
+TEMPLATES = {
+    'text_qr_image': [
+        {'type': 'static_text', 'content': 'ÜRÜN ETİKETİ', 'col_span': 6, 'row_span': 1, 'height_val': '30px', 'size': '16px', 'bold': True},
+        {'type': 'qrcode', 'name': 'Kod', 'qr_render': 'image', 'col_span': 2, 'row_span': 2, 'height_val': '80px', 'size': '12px'},
+        {'type': 'text', 'name': 'Ad', 'col_span': 4, 'row_span': 1, 'height_val': '40px', 'size': '14px'},
+        {'type': 'barcode_text', 'name': 'Kod', 'col_span': 4, 'row_span': 1, 'height_val': '40px', 'size': '12px'},
+    ],
+    'qr_svg_colors': [
+        {'type': 'qrcode', 'name': 'Kod', 'qr_render': 'svg', 'col_span': 2, 'row_span': 2, 'height_val': '80px', 'size': '12px'},
+        {'type': 'text', 'name': 'Ad', 'col_span': 4, 'row_span': 1, 'height_val': '40px', 'size': '14px',
+         'bgcolor_col': 'Renk', 'static_textcolor': '#333'},
+        {'type': 'text', 'name': 'Fiyat', 'col_span': 4, 'row_span': 1, 'height_val': '40px', 'size': '12px',
+         'textcolor_col': 'Renk'},
+    ],
+    'qr_symbol_repeated': [
+        {'type': 'qrcode', 'name': 'Grup', 'qr_render': 'symbol', 'col_span': 2, 'row_span': 1, 'height_val': '80px', 'size': '12px'},
+        {'type': 'text', 'name': 'Ad', 'col_span': 4, 'row_span': 1, 'height_val': '40px', 'size': '14px'},
+    ],
+}
+
+
+# --- Veri üretimi ---
+
+def generate_columns(rows, width, seed):
+    """Sabit tohumla sütun değerleri üretir (aynı argümanlar her zaman aynı veriyi verir)."""
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS)
+    columns = {
+        'Ad': [f'{a} {b}' for a, b in zip(words[rng.integers(0, len(WORDS), rows)], words[rng.integers(0, len(WORDS), rows)])],
+        'Kod': [f'K{n:08d}' for n in rng.integers(0, 10 ** 8, rows)],
+        'Grup': [f'G{n:03d}' for n in rng.integers(0, 200, rows)], # Çok tekrar eden değerler
+        'Fiyat': [f'{n:.2f}' for n in rng.uniform(1, 1000, rows)],
+        'Renk': list(np.array(COLORS)[rng.integers(0, len(COLORS), rows)]),
+    }
+    if width == 'wide':
+        for i in range(WIDE_EXTRA_COLUMNS):
+            columns[f'Alan{i + 1}'] = [f'{w}{n}' for w, n in zip(words[rng.integers(0, len(WORDS), rows)], rng.integers(0, 1000, rows))]
+    return columns
+
+
+def write_dataset(folder, name, extension, encoding, delimiter, width, rows):
+    """Veri setini dosyaya yazar; dosya yolunu döndürür."""
+    columns = generate_columns(rows, width, SEED + rows)
+    path = os.path.join(folder, f'{name}_{rows}.{extension}')
+    if extension == 'csv':
+        with open(path, 'w', encoding=encoding, newline='') as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            writer.writerow(columns)
+            writer.writerows(zip(*columns.values()))
+    else:
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(list(columns))
+        for row in zip(*columns.values()):
+            sheet.append(row)
+        workbook.save(path)
+    return path
+
+
+# --- Ölçüm yardımcıları ---
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # /proc olmayan sistemler: süreç ömrü boyunca en yüksek değer (Linux'ta KB, macOS'ta bayt)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class PeakMemory:
+    """Blok süresince RSS'i örnekleyerek tepe değeri ve başlangıca göre artışı ölçer."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start = self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __enter__(self):
+        self.start = self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+    def result(self):
+        return {'peak_rss_bytes': self.peak, 'peak_rss_delta_bytes': self.peak - self.start}
+
+
+def summarize(durations, units=None):
+    """Süre listesinden yüzdelikler ve verim (saniyede istek; units verilirse saniyede birim)."""
+    durations = np.asarray(durations, dtype=float)
+    total = float(durations.sum())
+    summary = {
+        'count': len(durations),
+        'total_s': total,
+        'mean_ms': float(durations.mean() * 1000),
+        'p50_ms': float(np.percentile(durations, 50) * 1000),
+        'p90_ms': float(np.percentile(durations, 90) * 1000),
+        'p99_ms': float(np.percentile(durations, 99) * 1000),
+        'max_ms': float(durations.max() * 1000),
+        'requests_per_s': len(durations) / total if total else None,
+    }
+    if units is not None:
+        summary['units_per_s'] = units / total if total else None
+    return summary
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def consume(response):
+    """Akış yanıtlarının da tamamını okuyup gövde boyutunu döndürür."""
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    return size
+
+
+# --- Senaryolar ---
+
+class Bench:
+    def __init__(self, app_module, repeats, print_rows):
+        self.appmod = app_module
+        self.app = app_module.app
+        self.repeats = repeats
+        self.print_rows = print_rows
+        self.results = []
+
+    def client(self):
+        client = self.app.test_client()
+        with client.session_transaction() as s:
+            s['logged_in'] = True
+        return client
+
+    def record(self, route, case, durations, memory=None, units=None, **extra):
+        entry = {'route': route, 'case': case, **summarize(durations, units)}
+        if memory is not None:
+            entry.update(memory.result())
+        entry.update(extra)
+        self.results.append(entry)
+        print(f"  {route:<16} {case:<48} p50 {entry['p50_ms']:9.1f} ms  p99 {entry['p99_ms']:9.1f} ms", flush=True)
+
+    def upload(self, client, path, case, rows):
+        with open(path, 'rb') as f:
+            content = f.read()
+        with PeakMemory() as memory:
+            duration, response = timed(client.post, '/', data={'file': (io.BytesIO(content), os.path.basename(path))},
+                                       content_type='multipart/form-data')
+        if response.status_code != 302 or not response.location.endswith('/table'):
+            raise RuntimeError(f'Yükleme başarısız: {path}')
+        self.record('upload', case, [duration], memory, units=rows, bytes=len(content), bytes_per_s=len(content) / duration)
+
+        # Aynı içerik tekrar yüklenince (özet eşleşmesi) mevcut Parquet kullanılır
+        duration, _ = timed(client.post, '/', data={'file': (io.BytesIO(content), os.path.basename(path))},
+                            content_type='multipart/form-data')
+        self.record('upload', f'{case}/tekrar', [duration], bytes=len(content))
+
+    def table(self, client, case, rows):
+        durations = [timed(client.get, '/table')[0] for _ in range(self.repeats)]
+        self.record('table_view', case, durations)
+
+        rng = np.random.default_rng(SEED)
+        queries = {
+            'sayfa': lambda: {'start': int(rng.integers(0, max(rows - 50, 1))), 'length': 50},
+            'genel_arama': lambda: {'start': 0, 'length': 50, 'search[value]': WORDS[int(rng.integers(0, len(WORDS)))]},
+            'sutun_filtresi': lambda: {'start': 0, 'length': 50, 'columns[1][search][value]': WORDS[int(rng.integers(0, len(WORDS)))]},
+            'siralama': lambda: {'start': int(rng.integers(0, max(rows - 50, 1))), 'length': 50,
+                                 'order[0][column]': 2, 'order[0][dir]': 'desc'},
+        }
+        for name, make_query in queries.items():
+            with PeakMemory() as memory:
+                durations = [timed(client.get, '/table/data', query_string=make_query())[0] for _ in range(self.repeats)]
+            self.record('table_data', f'{case}/{name}', durations, memory)
+
+    def wait_for_job(self, client):
+        with client.session_transaction() as s:
+            job_id = s['print_job_id']
+        while True:
+            job = client.get(f'/jobs/{job_id}').get_json()
+            if job['status'] in ('done', 'failed'):
+                return job
+            time.sleep(0.02)
+
+    def print_job(self, client, case, rows):
+        selected = min(rows, self.print_rows)
+        for template_name, template_rows in TEMPLATES.items():
+            template_id, _ = self.appmod.template_store.save_template(None, template_rows)
+            with client.session_transaction() as s:
+                s['template_id'] = template_id
+
+            with PeakMemory() as memory:
+                start = time.perf_counter()
+                client.post('/table', data={'selected_ranges': f'0-{selected - 1}'})
+                job = self.wait_for_job(client)
+                duration = time.perf_counter() - start
+            if job['status'] != 'done':
+                raise RuntimeError(f"Yazdırma işi başarısız: {job['message']}")
+            self.record('print_job', f'{case}/{template_name}', [duration], memory, units=selected, labels=selected)
+
+            durations, size = [], 0
+            for _ in range(max(1, self.repeats // 10)):
+                duration, size = timed(lambda: consume(client.get('/print_preview')))
+                durations.append(duration)
+            self.record('print_preview', f'{case}/{template_name}', durations, units=selected * len(durations), bytes=size)
+
+            with PeakMemory() as memory:
+                duration, size = timed(lambda: consume(client.get('/print_zpl')))
+            self.record('print_zpl', f'{case}/{template_name}', [duration], memory, units=selected, bytes=size)
+
+    def qrcode(self, client, count=500):
+        rng = np.random.default_rng(SEED)
+        values = [f'K{n:08d}-ç' for n in rng.integers(0, 10 ** 8, count)]
+        self.appmod.qr_cache._memory.clear()
+        paths = [f'/qrcode/{urllib.parse.quote(value)}' for value in values]
+        cold = [timed(client.get, path)[0] for path in paths]
+        self.record('generate_qrcode', 'ilk_uretim', cold, units=count)
+        warm = [timed(client.get, path)[0] for path in paths]
+        self.record('generate_qrcode', 'bellek_onbellegi', warm, units=count)
+        etag = client.get(paths[0]).headers.get('ETag')
+        conditional = [timed(client.get, paths[0], headers={'If-None-Match': etag})[0] for _ in range(count)]
+        self.record('generate_qrcode', 'kosullu_304', conditional, units=count)
+
+    def startup(self, runs=5):
+        """
+        'import app' süresini her seferinde yeni bir süreçte python -X importtime ile ölçer
+        (gunicorn işçisinin açılışı); en yavaş modüller ve warmup() süresi de kaydedilir.
+        """
+        durations, modules = [], {}
+        for _ in range(runs):
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=os.getcwd(),
+                                    env={**os.environ, 'PYTHONPATH': REPO_ROOT}, capture_output=True, text=True, check=True)
+            for line in result.stderr.splitlines():
+                if not line.startswith('import time:') or 'cumulative' in line:
+                    continue
+                _, cumulative, name = line[len('import time:'):].split('|')
+                modules[name.strip()] = int(cumulative) / 1e6
+            durations.append(modules['app'])
+        slowest = sorted(((name, s) for name, s in modules.items() if name != 'app'), key=lambda item: -item[1])[:10]
+        self.record('startup', 'import_app', durations, slowest_imports=dict(slowest))
+
+        code = 'import app; from warmup import warmup; print(warmup())'
+        warmup_s = [float(subprocess.run([sys.executable, '-c', code], cwd=os.getcwd(),
+                                         env={**os.environ, 'PYTHONPATH': REPO_ROOT},
+                                         capture_output=True, text=True, check=True).stdout)
+                    for _ in range(runs)]
+        self.record('startup', 'warmup', warmup_s)
+
+
+# --- Çalıştırma ve karşılaştırma ---
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    versions = {}
+    for name in ('flask', 'pandas', 'pyarrow', 'qrcode', 'openpyxl', 'numpy'):
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'packages': versions}
+
+
+def run(args):
+    sizes = [int(size) for size in args.sizes.split(',')]
+    work_dir = tempfile.mkdtemp(prefix='nlabel-bench-')
+    data_dir = os.path.join(work_dir, 'data')
+    os.makedirs(data_dir)
+    os.chdir(work_dir) # app.py uploads/ klasörünü çalışma dizinine göre oluşturur
+    sys.path.insert(0, REPO_ROOT)
+
+    import_start = time.perf_counter()
+    import app as app_module
+    import_s = time.perf_counter() - import_start
+    app_module.app.config['WTF_CSRF_ENABLED'] = False
+    logging.getLogger('nlabel.requests').setLevel(logging.WARNING) # İstek log satırları çıktıyı boğmasın
+    if args.workers:
+        app_module.app.config['RENDER_WORKERS'] = args.workers
+
+    bench = Bench(app_module, repeats=args.repeats, print_rows=args.print_rows)
+    print('startup', flush=True)
+    bench.startup()
+    for rows in sizes:
+        for name, extension, encoding, delimiter, width in DATASET_VARIANTS:
+            if extension == 'xlsx' and rows > XLSX_MAX_ROWS:
+                continue
+            if args.only and not any(part in name for part in args.only.split(',')):
+                continue
+            case = f'{name}/{rows}'
+            print(f'{case}: veri üretiliyor', flush=True)
+            path = write_dataset(data_dir, name, extension, encoding, delimiter, width, rows)
+            client = bench.client()
+            bench.upload(client, path, case, rows)
+            bench.table(client, case, rows)
+            if width == 'narrow':
+                bench.print_job(client, case, rows)
+            os.remove(path)
+    print('qrcode', flush=True)
+    bench.qrcode(bench.client())
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_revision': git_revision(),
+        'seed': SEED,
+        'sizes': sizes,
+        'repeats': args.repeats,
+        'print_rows': args.print_rows,
+        'app_import_s': import_s,
+        'environment': environment(),
+        'results': bench.results,
+    }
+    output = args.output or os.path.join(REPO_ROOT, 'benchmarks', 'results', f"bench_{report['git_revision'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'Sonuçlar: {output}')
+
+
+def compare(old_path, new_path, threshold=0.10):
+    """İki sonuç dosyasını rota/durum bazında karşılaştırır; p50 farkı eşiği aşanları işaretler."""
+    with open(old_path, encoding='utf-8') as f:
+        old = {(r['route'], r['case']): r for r in json.load(f)['results']}
+    with open(new_path, encoding='utf-8') as f:
+        new = {(r['route'], r['case']): r for r in json.load(f)['results']}
+    regressions = 0
+    print(f"{'rota':<16} {'durum':<48} {'eski p50':>10} {'yeni p50':>10} {'fark':>8}")
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key]['p50_ms'], new[key]['p50_ms']
+        change = (after - before) / before if before else 0.0
+        mark = ''
+        if change > threshold:
+            mark, regressions = ' YAVAŞLADI', regressions + 1
+        elif change < -threshold:
+            mark = ' hızlandı'
+        print(f'{key[0]:<16} {key[1]:<48} {before:10.1f} {after:10.1f} {change:+8.1%}{mark}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='nlabel performans ölçümü')
+    parser.add_argument('--sizes', default='1000,10000', help='Satır sayıları, virgülle ayrılmış (ör. 1000,100000,1000000)')
+    parser.add_argument('--repeats', type=int, default=30, help='Tekrarlanan istek sayısı (yüzdelikler için)')
+    parser.add_argument('--print-rows', type=int, default=5000, help='Yazdırma senaryolarında seçilecek en fazla satır')
+    parser.add_argument('--workers', type=int, default=None, help='RENDER_WORKERS (varsayılan: uygulama ayarı)')
+    parser.add_argument('--only', default=None, help='Yalnızca adı bu parçaları içeren veri setleri (ör. csv_utf8,xlsx)')
+    parser.add_argument('--output', default=None, help='JSON sonuç dosyası (varsayılan: benchmarks/results/bench_<git sürümü>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('ESKI', 'YENI'), help='İki sonuç dosyasını karşılaştır')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Karşılaştırmada yavaşlama eşiği (oran)')
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, threshold=args.threshold) else 0)
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# css_colors.py (CSS RENK DEĞERLERİNİ DOĞRULAMA VE NORMALLEŞTİRME)
+
+import re
+import numpy as np
+import pyarrow as pa
+
+# CSS Color Module Level 4 adlandırılmış renkleri
+CSS_COLOR_NAMES = frozenset('''
+aliceblue antiquewhite aqua aquamarine azure beige bisque black blanchedalmond blue blueviolet brown
+burlywood cadetblue chartreuse chocolate coral cornflowerblue cornsilk crimson cyan darkblue darkcyan
+darkgoldenrod darkgray darkgreen darkgrey darkkhaki darkmagenta darkolivegreen darkorange darkorchid
+darkred darksalmon darkseagreen darkslateblue darkslategray darkslategrey darkturquoise darkviolet
+deeppink deepskyblue dimgray dimgrey dodgerblue firebrick floralwhite forestgreen fuchsia gainsboro
+ghostwhite gold goldenrod gray green greenyellow grey honeydew hotpink indianred indigo ivory khaki
+lavender lavenderblush lawngreen lemonchiffon lightblue lightcoral lightcyan lightgoldenrodyellow
+lightgray lightgreen lightgrey lightpink lightsalmon lightseagreen lightskyblue lightslategray
+lightslategrey lightsteelblue lightyellow lime limegreen linen magenta maroon mediumaquamarine
+mediumblue mediumorchid mediumpurple mediumseagreen mediumslateblue mediumspringgreen mediumturquoise
+mediumvioletred midnightblue mintcream mistyrose moccasin navajowhite navy oldlace olive olivedrab
+orange orangered orchid palegoldenrod palegreen paleturquoise palevioletred papayawhip peachpuff peru
+pink plum powderblue purple rebeccapurple red rosybrown royalblue saddlebrown salmon sandybrown
+seagreen seashell sienna silver skyblue slateblue slategray slategrey snow springgreen steelblue tan
+teal thistle tomato turquoise violet wheat white whitesmoke yellow yellowgreen transparent
+'''.split())
+
+_HEX_RE = re.compile(r'#(?:[0-9a-f]{3,4}|[0-9a-f]{6}|[0-9a-f]{8})')
+_NUMBER = r'\s*(\d{1,3}(?:\.\d+)?%?)\s*'
+_RGB_RE = re.compile(rf'rgba?\({_NUMBER},{_NUMBER},{_NUMBER}(?:,\s*(\d*\.?\d+%?)\s*)?\)')
+
+
+def _channel(text):
+    """rgb() kanal değeri: 0-255 arası sayı veya 0-100 arası yüzde."""
+    if text.endswith('%'):
+        value = float(text[:-1])
+        return text if value <= 100 else None
+    value = float(text)
+    return text if value <= 255 else None
+
+
+def normalize_color(value):
+    """
+    Tek bir renk değerini doğrular ve normal biçime çevirir (küçük harf, boşluksuz).
+    Geçerli biçimler: #rgb/#rgba/#rrggbb/#rrggbbaa, CSS renk adları, rgb()/rgba().
+    Geçersiz veya boş değer için None döner.
+    """
+    if not isinstance(value, str):
+        return None
+    color = value.strip().lower()
+    if not color:
+        return None
+    if color in CSS_COLOR_NAMES or _HEX_RE.fullmatch(color):
+        return color
+
+    match = _RGB_RE.fullmatch(color)
+    if match:
+        red, green, blue, alpha = match.groups()
+        channels = [_channel(part) for part in (red, green, blue)]
+        if None in channels:
+            return None
+        if alpha is None:
+            return f'rgb({channels[0]}, {channels[1]}, {channels[2]})'
+        return f'rgba({channels[0]}, {channels[1]}, {channels[2]}, {alpha})'
+    return None
+
+
+def normalize_color_column(values):
+    """
+    Bir sütunun tüm değerlerini tek seferde çözer: her farklı değer bir kez doğrulanır,
+    sonuç kodlar üzerinden tüm satırlara dağıtılır. Geçersiz/boş değerler None olur.
+    """
+    encoded = pa.array(values).dictionary_encode()
+    uniques = encoded.dictionary.to_pylist()
+    resolved = np.array([normalize_color(value) for value in uniques] + [None], dtype=object)
+    codes = encoded.indices.fill_null(len(uniques)).to_numpy(zero_copy_only=False)
+    return resolved[codes] # Boş değerler sondaki None'a düşer
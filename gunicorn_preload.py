@@ -0,0 +1,20 @@
+# gunicorn_preload.py (İSTEĞE BAĞLI GUNICORN AYARLARI: UYGULAMAYI ÇATALLAMADAN ÖNCE YÜKLEYİP ISITMA)
+#
+# Kullanım (procfile'daki komutun yerine):
+#   gunicorn -c gunicorn_preload.py --bind 0.0.0.0:$PORT app:app
+# Uygulama ana süreçte bir kez yüklenir ve warmup.warmup() ile CSV, Parquet, etiket ve QR yolları
+# çalıştırılır; işçiler bu belleği yazma-anında-kopyalama ile paylaşır, her işçinin açılışı ve ilk
+# isteği kütüphane yükleme bedelini ödemez. Uygulama kodu değişince işçiler değil ana süreç yeniden
+# başlatılmalıdır (preload ile --reload birlikte kullanılmaz).
+#
+# Açılış süresini ölçmek için (sütunlar: modülün kendi süresi | içe aktardıklarıyla toplam, µs):
+#   python -X importtime -c "import app" 2> importtime.log
+# ya da benchmarks/bench.py çıktısındaki 'startup' satırları.
+
+preload_app = True
+
+
+def on_starting(server):
+    """Ana süreçte, işçiler çatallanmadan önce (uygulama preload ile yüklenmiş durumda)."""
+    from warmup import warmup
+    server.log.info('Isınma tamamlandı: %.2f sn', warmup())
@@ -0,0 +1,287 @@
+# ingest.py (YÜKLENEN DOSYALARI OKUMA VE PARQUET'E DÖNÜŞTÜRME YARDIMCILARI)
+
+import csv
+import datetime
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from metrics import span
+
+CSV_SEPARATORS = ('\t', ',', ';')
+MIN_EXPECTED_COLUMNS = 2
+SNIFF_SAMPLE_BYTES = 64 * 1024 # Tespit için okunacak örnek boyutu
+SNIFF_MAX_LINES = 50
+CSV_BLOCK_BYTES = 8 * 1024 * 1024 # pyarrow akış okuyucusunun blok (row group) boyutu
+CHUNK_ROWS = 50_000 # pandas/openpyxl yolunda bir row group'taki satır sayısı
+# pyarrow.csv, pandas ve openpyxl yalnızca ilgili dönüşümde içe aktarılır: işçi açılışını
+# yavaşlatmasınlar (önceden yükleme için warmup.py)
+
+# cp1254'te Türkçe harflere karşılık gelen (latin1'de İzlandaca harf olan) baytlar: Ğ İ Ş ğ ı ş
+_CP1254_TURKISH_BYTES = frozenset(b'\xd0\xdd\xde\xf0\xfd\xfe')
+_UTF8_BOM = b'\xef\xbb\xbf'
+# Dosyanın geri kalanı tespit edilen kodlamayla çözülemezse denenecek sıradaki kodlama
+CSV_FALLBACK_ENCODINGS = {'utf-8': 'cp1254', 'cp1254': 'latin1'}
+
+
+def _detect_encoding(sample, truncated):
+    """Örnek baytlardan kodlamayı ve güven oranını (0-1) tahmin eder."""
+    if sample.startswith(_UTF8_BOM):
+        return 'utf-8', 1.0
+
+    if sample.isascii():
+        # ASCII örnek her kodlamada aynıdır; Türkçe karakterler örnekten sonra başlayabilir
+        return 'utf-8', (0.9 if truncated else 1.0)
+
+    try:
+        sample.decode('utf-8')
+        return 'utf-8', 1.0
+    except UnicodeDecodeError as e:
+        # Örnek çok baytlı bir karakterin ortasında kesilmiş olabilir
+        if truncated and e.start >= len(sample) - 3:
+            try:
+                sample[:e.start].decode('utf-8')
+                return 'utf-8', 0.99
+            except UnicodeDecodeError:
+                pass
+
+    try:
+        sample.decode('cp1254')
+    except UnicodeDecodeError:
+        # cp1254'te tanımsız bayt var (0x81, 0x8D...), tek seçenek latin1
+        return 'latin1', 0.9
+
+    if any(b in _CP1254_TURKISH_BYTES or 0x80 <= b <= 0x9f for b in sample):
+        return 'cp1254', 0.95
+    # Ayırt edici bayt yok; cp1254 ve latin1 aynı metni verir
+    return 'cp1254', 1.0
+
+
+def _detect_separator(text, truncated):
+    """Örnek metinden ayırıcıyı, başlık satırını ve güven oranını tahmin eder."""
+    lines = text.splitlines()
+    if truncated and len(lines) > 1:
+        lines = lines[:-1] # Yarım kalan son satırı dikkate alma
+    lines = [line for line in lines if line.strip()][:SNIFF_MAX_LINES]
+    if not lines:
+        return None, [], 0.0
+
+    best = (None, [], 0.0)
+    for sep in CSV_SEPARATORS:
+        rows = list(csv.reader(lines, delimiter=sep))
+        if not rows:
+            continue
+        counts = [len(fields) for fields in rows]
+        column_count = max(set(counts), key=counts.count)
+        if column_count < MIN_EXPECTED_COLUMNS:
+            continue
+        confidence = counts.count(column_count) / len(counts)
+        # Önce tutarlılık, eşitlikte daha fazla sütun üreten ayırıcı kazanır
+        if (confidence, column_count) > (best[2], len(best[1])):
+            best = (sep, rows[0], confidence)
+    return best[0], best[1], round(best[2], 2)
+
+
+def sniff_csv(filepath, sample_bytes=SNIFF_SAMPLE_BYTES):
+    """
+    Dosyanın başından tek seferlik bir örnek okuyarak kodlamayı ve ayırıcıyı tespit eder.
+    Dönüş: {'encoding', 'sep', 'header', 'encoding_confidence', 'sep_confidence'}
+    """
+    with open(filepath, 'rb') as f:
+        sample = f.read(sample_bytes)
+        truncated = bool(f.read(1))
+
+    if not sample.strip():
+        raise ValueError("CSV okuma hatası: Dosya boş.")
+
+    with span('csv_sniff_encoding', bytes=len(sample)):
+        encoding, encoding_confidence = _detect_encoding(sample, truncated)
+        text = sample.decode(encoding, errors='ignore')
+        if text.startswith('\ufeff'):
+            text = text[1:]
+
+    with span('csv_sniff_separator', bytes=len(sample)) as measured:
+        sep, header, sep_confidence = _detect_separator(text, truncated)
+        measured.rows = min(text.count('\n') + 1, SNIFF_MAX_LINES)
+    if sep is None:
+        raise ValueError("CSV okuma hatası: Geçerli bir kodlama veya ayırıcı bulunamadı.")
+
+    return {
+        'encoding': encoding,
+        'sep': sep,
+        'header': header,
+        'encoding_confidence': encoding_confidence,
+        'sep_confidence': sep_confidence,
+    }
+
+
+def _string_schema(columns):
+    """Tüm sütunları metin olarak tutan Arrow şeması (dtype=str karşılığı)."""
+    return pa.schema([(name, pa.string()) for name in columns])
+
+
+def _csv_to_parquet_arrow(filepath, parquet_path, detection):
+    """pyarrow akış okuyucusu ile CSV'yi blok blok okuyup her bloğu bir row group olarak yazar."""
+    import pyarrow.csv as pa_csv
+    columns = detection['header']
+    reader = pa_csv.open_csv(
+        filepath,
+        read_options=pa_csv.ReadOptions(encoding=detection['encoding'], block_size=CSV_BLOCK_BYTES),
+        parse_options=pa_csv.ParseOptions(delimiter=detection['sep'], newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in columns},
+            strings_can_be_null=False, quoted_strings_can_be_null=False, null_values=[],
+        ),
+    )
+    rows = 0
+    with pq.ParquetWriter(parquet_path, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return reader.schema.names, rows
+
+
+def _csv_to_parquet_pandas(filepath, parquet_path, detection):
+    """pandas'ın parça parça (chunksize) okuyucusu ile aynı işi yapan yedek yol."""
+    import pandas as pd
+    writer = None
+    rows = 0
+    try:
+        chunks = pd.read_csv(filepath, encoding=detection['encoding'], sep=detection['sep'],
+                             dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS)
+        for chunk in chunks:
+            if writer is None:
+                schema = _string_schema([str(name) for name in chunk.columns])
+                writer = pq.ParquetWriter(parquet_path, schema)
+            chunk.columns = schema.names
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError("CSV okuma hatası: Dosyada veri bulunamadı.")
+    return schema.names, rows
+
+
+def _is_decode_error(error):
+    """Dosyanın tespit edilen kodlamayla çözülemediğini gösteren hata mı (pyarrow ya da pandas)."""
+    message = str(error).lower()
+    return isinstance(error, UnicodeDecodeError) or 'invalid utf8' in message or "can't decode" in message
+
+
+def _convert_csv(filepath, parquet_path, detection, size):
+    header = detection['header']
+    # Boş ya da tekrar eden başlıklar pandas'ın "Unnamed: 0" / "a.1" adlandırmasıyla ele alınır
+    if all(header) and len(set(header)) == len(header):
+        try:
+            # Başarısız deneme de süresi ve hata sayacıyla kaydedilir
+            with span('csv_to_parquet_arrow', bytes=size) as measured:
+                columns, measured.rows = _csv_to_parquet_arrow(filepath, parquet_path, detection)
+            return columns, measured.rows
+        except pa.ArrowInvalid as e:
+            if os.path.exists(parquet_path): os.remove(parquet_path)
+            if _is_decode_error(e):
+                raise # Aynı kodlamayla pandas da çözemez
+    with span('csv_to_parquet_pandas', bytes=size) as measured:
+        columns, measured.rows = _csv_to_parquet_pandas(filepath, parquet_path, detection)
+    return columns, measured.rows
+
+
+def csv_to_parquet(filepath, parquet_path, detection):
+    """
+    CSV'yi bellek kullanımı dosya boyutundan bağımsız kalacak şekilde Parquet'e dönüştürür.
+    Tespit edilen kodlama dosyanın örnekten sonraki kısmını çözemezse sırayla cp1254 ve latin1
+    (her baytı çözer) ile yeniden dönüştürülür; detection['encoding'] kullanılan kodlamayla güncellenir.
+    Dönüş: (sütun adları, satır sayısı)
+    """
+    size = os.path.getsize(filepath)
+    while True:
+        try:
+            return _convert_csv(filepath, parquet_path, detection, size)
+        except (pa.ArrowInvalid, UnicodeDecodeError) as e:
+            fallback = CSV_FALLBACK_ENCODINGS.get(detection['encoding'])
+            if not _is_decode_error(e) or fallback is None:
+                raise
+            if os.path.exists(parquet_path): os.remove(parquet_path)
+        detection['encoding'] = fallback
+        detection['encoding_confidence'] = min(detection['encoding_confidence'], 0.9)
+
+
+def _excel_cell_to_str(value):
+    """openpyxl hücre değerini read_excel(dtype=str, keep_default_na=False) çıktısına benzetir."""
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        import pandas as pd
+        return str(pd.Timestamp(value))
+    return str(value)
+
+
+def xlsx_to_parquet(filepath, parquet_path):
+    """
+    XLSX'in ilk sayfasını openpyxl read_only modunda satır satır okuyup
+    CHUNK_ROWS'luk parçalar halinde Parquet'e yazar. Dönüş: (sütun adları, satır sayısı)
+    """
+    with span('xlsx_to_parquet', bytes=os.path.getsize(filepath)) as measured:
+        columns, measured.rows = _xlsx_to_parquet(filepath, parquet_path)
+    return columns, measured.rows
+
+
+def _xlsx_to_parquet(filepath, parquet_path):
+    import openpyxl
+    workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        row_iter = workbook.worksheets[0].iter_rows(values_only=True)
+        header_row = next(row_iter, None)
+        if header_row is None:
+            raise ValueError("Excel okuma hatası: Dosyada veri bulunamadı.")
+
+        columns = []
+        for i, value in enumerate(header_row):
+            base = name = _excel_cell_to_str(value) or f'Unnamed: {i}'
+            suffix = 1
+            while name in columns: # read_excel gibi tekrar eden başlıkları numaralandır
+                name = f'{base}.{suffix}'
+                suffix += 1
+            columns.append(name)
+        schema = _string_schema(columns)
+        width = len(columns)
+
+        rows = 0
+        buffer = [[] for _ in columns]
+
+        def flush():
+            arrays = [pa.array(column_values, pa.string()) for column_values in buffer]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+        with pq.ParquetWriter(parquet_path, schema) as writer:
+            pending_blank = 0
+            for values in row_iter:
+                if all(v is None for v in values):
+                    # Boş satırlar read_excel gibi yalnızca arada kalıyorsa korunur, sondakiler atılır
+                    pending_blank += 1
+                    continue
+                for column_values in buffer:
+                    column_values.extend([''] * pending_blank)
+                pending_blank = 0
+                values = tuple(values[:width]) + (None,) * (width - len(values))
+                for column_values, value in zip(buffer, values):
+                    column_values.append(_excel_cell_to_str(value))
+                if len(buffer[0]) >= CHUNK_ROWS:
+                    flush()
+                    rows += len(buffer[0])
+                    buffer = [[] for _ in columns]
+            if buffer[0] or rows == 0:
+                flush()
+                rows += len(buffer[0])
+        return columns, rows
+    finally:
+        workbook.close()
+
+
+def describe_detection(detection):
+    """Tespit sonucunu kullanıcıya gösterilecek kısa metne çevirir."""
+    sep_names = {'\t': 'TAB', ',': 'virgül', ';': 'noktalı virgül'}
+    confidence = min(detection['encoding_confidence'], detection['sep_confidence'])
+    return (f"kodlama: {detection['encoding']}, ayırıcı: {sep_names.get(detection['sep'], detection['sep'])}, "
+            f"güven: %{int(confidence * 100)}")
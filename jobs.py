@@ -0,0 +1,110 @@
+# jobs.py (ARKA PLAN İŞ KUYRUĞU: SQLITE İŞ TABLOSU + İŞ PARÇACIĞI HAVUZU)
+
+import json
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+'''
+
+
+class Job:
+    """Çalışan işin ilerlemesini iş tablosuna yazmak için işlev'e verilen tutamaç."""
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.id = job_id
+
+    def update(self, progress=None, total=None, message=None):
+        self.queue._update(self.id, progress=progress, total=total, message=message)
+
+
+class JobQueue:
+    """
+    Yerel arka plan iş kuyruğu. İş durumu SQLite'ta tutulur; böylece hangi gunicorn
+    işçisi sorarsa sorsun ilerleme okunabilir. İşler, işi kabul eden süreçteki
+    iş parçacığı havuzunda çalışır.
+    """
+
+    def __init__(self, db_path, workers=2, stale_after=15 * 60):
+        self.db_path = db_path
+        self.stale_after = stale_after # Bu süre boyunca güncellenmeyen iş yarıda kesilmiş sayılır
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """İşlem sonunda commit edip bağlantıyı kapatan kısa ömürlü bağlantı."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _update(self, job_id, **fields):
+        fields = {name: value for name, value in fields.items() if value is not None}
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def submit(self, kind, func, *args, **kwargs):
+        """func(job, *args, **kwargs) işini kuyruğa ekler ve iş kimliğini döndürür."""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('INSERT INTO jobs (id, kind, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                         (job_id, kind, JOB_QUEUED, now, now))
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        self._update(job_id, status=JOB_RUNNING)
+        try:
+            result = func(Job(self, job_id), *args, **kwargs)
+        except Exception as e:
+            self._update(job_id, status=JOB_FAILED, message=str(e))
+            return
+        self._update(job_id, status=JOB_DONE, result=json.dumps(result, ensure_ascii=False))
+
+    def delete_older_than(self, cutoff):
+        """cutoff zamanından beri güncellenmeyen iş kayıtlarını siler. Dönüş: silinen kayıt sayısı"""
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM jobs WHERE updated_at < ?', (cutoff,)).rowcount
+
+    def get(self, job_id):
+        """İş kaydını sözlük olarak döndürür; yoksa None."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job['status'] in (JOB_QUEUED, JOB_RUNNING) and time.time() - job['updated_at'] > self.stale_after:
+            # İşi çalıştıran süreç yeniden başlatılmış ya da çökmüş
+            job['status'], job['message'] = JOB_FAILED, 'İş yarıda kesildi.'
+            self._update(job_id, status=job['status'], message=job['message'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
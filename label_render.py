@@ -0,0 +1,390 @@
+# label_render.py (ETİKET ŞABLONUNU BİR KEZ DERLEYİP SÜTUN DİZİLERİNDEN ETİKET ÜRETME)
+
+import multiprocessing
+import threading
+import urllib.parse
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from markupsafe import escape
+import numpy as np
+import pyarrow.parquet as pq
+from css_colors import normalize_color, normalize_color_column
+from metrics import span, timed_batches
+from qr_cache import qr_cache_key, qr_svg_path
+from table_query import data_columns, iter_take_rows, take_rows
+
+MISSING_VALUE = 'VERİ YOK' # Şablondaki sütun veride yoksa yazılacak metin
+
+LABEL_OPEN = """
+        <div class="etiket-kutu">
+            <div class="etiket-grid">
+        """
+LABEL_CLOSE = '</div></div>' # etiket-grid ve etiket-kutu kapat
+
+# QR hücresi çizim biçimleri: ayrı PNG isteği, satır içi SVG yolu, tekrar eden değerler için <symbol>/<use>
+QR_RENDER_MODES = ('image', 'svg', 'symbol')
+QR_BOX_SIZE = 4 # PNG ile aynı görünür boyut için modül başına piksel
+RENDER_BATCH_ROWS = 2000 # Akış ve paralel render'da bir parçadaki satır sayısı
+COMPILED_CACHE_ITEMS = 64 # Süreç başına saklanan derlenmiş şablon sayısı
+QR_STYLE = 'max-height: 100%; width: auto; max-width: 100%; display: block; margin: 0 auto;'
+
+
+def as_text(values):
+    """Sütun değerlerini hücre metnine çevirir; boş (None) değerler MISSING_VALUE olur."""
+    return [MISSING_VALUE if value is None else str(value) for value in values]
+
+
+def _qr_url(qr_url_prefix):
+    """Değer listesini generate_qrcode adreslerine çevirir (url_for ile aynı çift kodlama)."""
+    def build(values):
+        return [qr_url_prefix + urllib.parse.quote(text, safe='').replace('%', '%25') for text in as_text(values)]
+    return build
+
+
+def _qr_svg_attrs(size, text):
+    pixels = size * QR_BOX_SIZE
+    return (f'width="{pixels}" height="{pixels}" viewBox="0 0 {size} {size}" shape-rendering="crispEdges" '
+            f'role="img" aria-label="QR Kod: {escape(text)}" style="{QR_STYLE}"')
+
+
+def _qr_inline_svg(values):
+    """Her değer için sayfaya gömülü, tek yoldan oluşan SVG üretir."""
+    svgs = []
+    for text in as_text(values):
+        size, path = qr_svg_path(text)
+        svgs.append(f'<svg {_qr_svg_attrs(size, text)}><path d="{path}"/></svg>')
+    return svgs
+
+
+def _qr_symbol_id(text):
+    return 'qr-' + qr_cache_key(text)[:16]
+
+
+def _qr_symbol_use(values):
+    """Her değer için qr_symbol_defs'teki ortak <symbol>'e başvuran küçük bir SVG üretir."""
+    uses = []
+    for text in as_text(values):
+        size, _ = qr_svg_path(text)
+        uses.append(f'<svg {_qr_svg_attrs(size, text)}><use href="#{_qr_symbol_id(text)}"/></svg>')
+    return uses
+
+
+def _color(static_value, default):
+    """Önceden çözülmüş renk sütununda geçersiz/boş olanlara statik ya da varsayılan rengi yerleştirir."""
+    fallback = normalize_color(static_value) or default
+    def build(resolved):
+        colors = resolved.copy()
+        colors[np.equal(resolved, None)] = fallback
+        return colors.tolist()
+    return build
+
+
+def merge_static_parts(plan):
+    """Plandaki art arda gelen sabit parçaları (str) tek parçada birleştirir."""
+    merged = []
+    for part in plan:
+        if isinstance(part, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += part
+        else:
+            merged.append(part)
+    return merged
+
+
+def compile_template(template_rows, qr_url_prefix):
+    """
+    label_template_rows listesini bir kez işleyip render planına çevirir.
+    Plan; sabit HTML parçaları (str) ile satıra bağlı (kaynak, sütun_adı, dönüştürücü) parçalarından oluşur.
+    Kaynak 'value' ve 'qr_symbol' ham sütun değerlerini, 'color' ise prepare_batch'te çözülmüş
+    renk sütununu ifade eder ('qr_symbol' sütunları ayrıca qr_symbol_defs'e girer).
+    Satırdan bağımsız tüm stil ve içerik burada önceden hazırlanır.
+    """
+    plan = [LABEL_OPEN]
+
+    def static(text):
+        plan.append(text)
+
+    def dynamic(column_name, builder, source='value'):
+        plan.append((source, column_name, builder))
+
+    for item in template_rows:
+        item_type = item.get('type')
+        col_span = item.get('col_span', 1)
+        row_span = item.get('row_span', 1)
+        height_val = item.get('height_val', '40px')
+        font_size = item.get('size', '12px')
+
+        bold_style = 'font-weight: bold;' if item.get('bold') else ''
+        italic_style = 'font-style: italic;' if item.get('italic') else ''
+
+        # CSS Grid için span değerlerini ayarla
+        grid_style = f"grid-column: span {col_span}; grid-row: span {row_span}; min-height: {height_val};"
+
+        # *** RENK YÖNETİMİ *** (Geçerli ilk değer: Dinamik > Statik > Varsayılan)
+        bgcolor_col = item.get('bgcolor_col')
+        static_bgcolor = item.get('static_bgcolor', '')
+        textcolor_col = item.get('textcolor_col')
+        static_textcolor = item.get('static_textcolor', '')
+
+        static(f'<div class="label-cell" style="{grid_style} background-color: ')
+        if bgcolor_col:
+            dynamic(bgcolor_col, _color(static_bgcolor, 'transparent'), source='color')
+        else:
+            static(normalize_color(static_bgcolor) or 'transparent')
+        static('; color: ')
+        if textcolor_col:
+            dynamic(textcolor_col, _color(static_textcolor, '#000'), source='color')
+        else:
+            static(normalize_color(static_textcolor) or '#000')
+        static(f'; {bold_style} {italic_style}">')
+
+        # --- İçerik Oluşturma ---
+        common_text_style = f'margin: 0; padding: 0; word-break: break-all; white-space: normal; line-height: 1.2; font-size: {font_size};'
+
+        if item_type == 'static_text':
+            content = item.get('content', '')
+            static(f'<div style="text-align: center; {common_text_style}">{content}</div>')
+
+        elif item_type == 'image_logo':
+            url = item.get('name', '')
+            static(f'<div style="text-align: center;"><img src="{url}" alt="Logo" style="max-height: 100%; width: auto; max-width: 100%; display: inline-block;"></div>')
+
+        elif item_type == 'qrcode':
+            column_name = item.get('name')
+            qr_render = item.get('qr_render', 'image')
+            static('''
+                    <div style="text-align: center; padding: 5px; height: 100%;">
+                        ''')
+            if qr_render == 'svg':
+                dynamic(column_name, _qr_inline_svg)
+            elif qr_render == 'symbol':
+                dynamic(column_name, _qr_symbol_use, source='qr_symbol')
+            else:
+                static('<img src="')
+                dynamic(column_name, _qr_url(qr_url_prefix))
+                static('" alt="QR Kod: ')
+                dynamic(column_name, as_text)
+                static(f'" style="{QR_STYLE}">')
+            static('''
+                    </div>
+                ''')
+
+        elif item_type in ('text', 'barcode_text'):
+            column_name = item.get('name')
+            text_align = 'center' if item_type == 'barcode_text' else 'left'
+            static(f'<div style="text-align: {text_align}; {common_text_style}">')
+            dynamic(column_name, as_text)
+            static('</div>')
+
+        static('</div>') # label-cell kapat
+
+    static(LABEL_CLOSE)
+
+    return merge_static_parts(plan)
+
+
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compiled_template(template_rows, qr_url_prefix, template_version=None):
+    """
+    compile_template'in önbellekli hali. template_version (ör. (şablon kimliği, sürüm))
+    verilirse plan süreç içinde saklanır; aynı sürüm için şablon yeniden derlenmez.
+    """
+    if template_version is None:
+        return compile_template(template_rows, qr_url_prefix)
+    key = (template_version, qr_url_prefix)
+    with _compiled_lock:
+        plan = _compiled.get(key)
+        if plan is not None:
+            _compiled.move_to_end(key)
+            return plan
+    plan = compile_template(template_rows, qr_url_prefix)
+    with _compiled_lock:
+        _compiled[key] = plan
+        while len(_compiled) > COMPILED_CACHE_ITEMS:
+            _compiled.popitem(last=False)
+    return plan
+
+
+def plan_columns(plan):
+    """Planın okuması gereken veri sütunları."""
+    return sorted({part[1] for part in plan if not isinstance(part, str)})
+
+
+def prepare_batch(plan, table):
+    """
+    Yazdırma verisini (pyarrow Table) plana göre hazırlar: ham değer listeleri ve
+    renk olarak kullanılan her sütun için bir kez doğrulanmış/normalleştirilmiş renk dizisi.
+    Dönüş: {(kaynak, sütun_adı): değerler}
+    """
+    batch = {}
+    for part in plan:
+        if isinstance(part, str):
+            continue
+        source, column_name, _ = part
+        if (source, column_name) in batch or column_name not in table.column_names:
+            continue
+        values = table.column(column_name).to_pylist()
+        batch[(source, column_name)] = normalize_color_column(values) if source == 'color' else values
+    return batch
+
+
+def qr_symbol_texts(batch):
+    """'symbol' biçimindeki QR hücrelerinde geçen farklı değerler (ilk görülme sırasıyla)."""
+    return list(dict.fromkeys(text for (source, _), values in batch.items() if source == 'qr_symbol'
+                              for text in as_text(values)))
+
+
+def qr_symbol_defs(texts):
+    """
+    'symbol' biçimindeki QR hücrelerinin farklı değerleri için sayfada bir kez yer alacak
+    <symbol> tanımları. Aynı değer kaç etikette geçerse geçsin yol verisi bir kez gönderilir.
+    """
+    texts = dict.fromkeys(texts)
+    if not texts:
+        return ''
+    symbols = []
+    for text in texts:
+        size, path = qr_svg_path(text)
+        symbols.append(f'<symbol id="{_qr_symbol_id(text)}" viewBox="0 0 {size} {size}"><path d="{path}"/></symbol>')
+    return ('<svg xmlns="http://www.w3.org/2000/svg" style="position: absolute; width: 0; height: 0;" aria-hidden="true">'
+            + ''.join(symbols) + '</svg>')
+
+
+def render_labels(plan, batch, row_count):
+    """
+    Derlenmiş planı prepare_batch çıktısı üzerinde uygular.
+    Her dinamik parça tüm satırlar için tek seferde hesaplanır; satır başına sadece birleştirme yapılır.
+    """
+    segments = []
+    for part in plan:
+        if isinstance(part, str):
+            segments.append(repeat(part, row_count))
+        else:
+            source, column_name, builder = part
+            values = batch.get((source, column_name))
+            if values is None:
+                # Veride olmayan sütun: renkler sabit/varsayılana, metinler MISSING_VALUE'ya düşer
+                values = np.full(row_count, None, dtype=object) if source == 'color' else repeat(None, row_count)
+            segments.append(builder(values))
+    return [''.join(parts) for parts in zip(*segments)]
+
+
+def render_rows(parquet_path, template_rows, qr_url_prefix, indices=None, template_version=None):
+    """
+    Kaynak Parquet'in verilen satırlarını (None ise tamamını) etikete çevirir.
+    Süreç havuzunda da çalışabilmesi için şablonu kendisi derler (template_version verilirse
+    süreç başına bir kez) ve yalnızca bu satırları içeren row group'lardan, şablonun kullandığı
+    sütunları okur.
+    Dönüş: (etiketler, 'symbol' QR değerleri)
+    """
+    plan = compiled_template(template_rows, qr_url_prefix, template_version)
+    parquet_file = pq.ParquetFile(parquet_path)
+    columns = _read_columns(plan, parquet_file)
+    if indices is None:
+        table = parquet_file.read(columns=columns)
+    else:
+        table = take_rows(parquet_file, indices, columns=columns)
+    return render_table(table, template_rows, qr_url_prefix, template_version)
+
+
+def render_table(table, template_rows, qr_url_prefix, template_version=None):
+    """Okunmuş satırları (pyarrow Table) etikete çevirir. Dönüş: (etiketler, 'symbol' QR değerleri)"""
+    plan = compiled_template(template_rows, qr_url_prefix, template_version)
+    batch = prepare_batch(plan, table) # Renk sütunları burada bir kez çözülür
+    return render_labels(plan, batch, table.num_rows), qr_symbol_texts(batch)
+
+
+def _read_columns(plan, parquet_file):
+    """Planın kullandığı ve veride bulunan sütunlar."""
+    available = data_columns(parquet_file)
+    return [name for name in plan_columns(plan) if name in available]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers):
+    """
+    Süreç başına tek render havuzu; ilk çağrıdaki workers (RENDER_WORKERS) ile kurulur ve yeniden
+    kurulmaz: yarıda kalmış akış önizlemeleri ve arka plan işleri aynı havuza iş göndermeye devam eder.
+    Çağrı başına paralellik gönderilen parça sayısıyla sınırlanır. Havuz iş kuyruğu iş parçacıklarından
+    kurulabildiğinden alt süreçler fork yerine forkserver (yoksa spawn) ile başlatılır.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _executor
+
+
+def _all_rows(parquet_path, indices):
+    if indices is None:
+        return np.arange(pq.ParquetFile(parquet_path).metadata.num_rows, dtype=np.int64)
+    return np.asarray(indices, dtype=np.int64)
+
+
+def render_print_file(parquet_path, template_rows, qr_url_prefix, indices=None, workers=1, min_parallel_rows=5000,
+                      template_version=None):
+    """
+    Kaynak Parquet'in seçili satırlarını (indices, None ise tümü) tek seferde etiketlere çevirir.
+    Parçalar iter_print_file ile üretilip sırayla birleştirilir; paralel işleme kararı da orada verilir.
+    Dönüş: (etiketler, 'symbol' QR değerleri)
+    """
+    labels, symbol_texts = [], []
+    # Alt süreçlerin kendi aşamaları (QR kodlama vb.) bu süreçte görünmez; toplam süre burada ölçülür
+    with span('label_render') as measured:
+        for part_labels, part_symbols in iter_print_file(parquet_path, template_rows, qr_url_prefix, indices,
+                                                         workers, min_parallel_rows, template_version):
+            labels.extend(part_labels)
+            symbol_texts.extend(part_symbols)
+        measured.rows = len(labels)
+        measured.bytes = sum(map(len, labels))
+    return labels, symbol_texts
+
+
+def iter_print_file(parquet_path, template_rows, qr_url_prefix, indices=None, workers=1, min_parallel_rows=5000,
+                    template_version=None):
+    """
+    Etiketleri RENDER_BATCH_ROWS satırlık parçalar halinde üretir; akış (streaming) önizleme için
+    her adımda (etiketler, 'symbol' QR değerleri) verir. Satırlar bu süreçte iter_take_rows ile
+    okunur (her row group bir kez çözülür). Paralel modda her parçanın tablosu ayrı bir iş olarak
+    süreç havuzuna gönderilir, aynı anda en fazla 2 * workers iş bekler ve sonuçlar sırayla verilir.
+    """
+    indices = _all_rows(parquet_path, indices)
+    parquet_file = pq.ParquetFile(parquet_path)
+    columns = _read_columns(compiled_template(template_rows, qr_url_prefix, template_version), parquet_file)
+    tables = iter_take_rows(parquet_file, indices, RENDER_BATCH_ROWS, columns=columns)
+    parallel = min(workers, -(-len(indices) // RENDER_BATCH_ROWS))
+    if parallel <= 1 or len(indices) < min_parallel_rows:
+        for table in tables:
+            yield render_table(table, template_rows, qr_url_prefix, template_version)
+        return
+
+    executor = _get_executor(workers)
+    pending = deque()
+    for table in tables:
+        pending.append(executor.submit(render_table, table, template_rows, qr_url_prefix, template_version))
+        if len(pending) >= 2 * parallel:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def iter_preview_html(parquet_path, template_rows, qr_url_prefix, **options):
+    """
+    iter_print_file çıktısını sayfaya yazılacak HTML parçalarına çevirir. Yeni görülen
+    'symbol' QR değerlerinin tanımları, onları kullanan etiketlerden hemen önce gönderilir.
+    """
+    sent_symbols = set()
+    batches = timed_batches('label_render', iter_print_file(parquet_path, template_rows, qr_url_prefix, **options),
+                            lambda batch: (len(batch[0]), sum(map(len, batch[0]))))
+    for labels, symbol_texts in batches:
+        new_symbols = [text for text in symbol_texts if text not in sent_symbols]
+        sent_symbols.update(new_symbols)
+        yield qr_symbol_defs(new_symbols) + '\n'.join(labels) + '\n'
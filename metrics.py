@@ -0,0 +1,296 @@
+# metrics.py (İSTEK VE AŞAMA SÜRELERİ: PROMETHEUS METİN ÇIKTISI, YAPISAL LOG, ÖRNEKLEMELİ PROFİLLEYİCİ)
+
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Süre histogramlarının üst sınırları (saniye)
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Bu istekte kaydedilen aşamalar (yapısal log satırı için); istek dışında (arka plan işi) None
+_request_spans = contextvars.ContextVar('request_spans', default=None)
+
+
+class _Registry:
+    """
+    Süreç içi metrik deposu: etiketli histogramlar ve sayaçlar. Her gunicorn işçisi kendi
+    değerlerini tutar; Prometheus her işçiyi ayrı hedef olarak toplamalıdır.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {} # (ad, etiketler) -> [kova sayıları, toplam, adet]
+        self._counters = Counter() # (ad, etiketler) -> değer
+        self._help = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(DURATION_BUCKETS), 0.0, 0]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def inc(self, name, labels, value=1):
+        if value:
+            with self._lock:
+                self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def clear(self):
+        """Tüm değerleri sıfırlar (ör. ısınma sırasında kaydedilenler işçilere geçmesin diye)."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self):
+        """Prometheus metin biçimi (text/plain; version=0.0.4)."""
+        with self._lock:
+            histograms = {key: (list(b), s, c) for key, (b, s, c) in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = []
+        for name in sorted({key[0] for key in histograms} | {key[0] for key in counters}):
+            kind, text = self._help.get(name, ('untyped', ''))
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'{name}_bucket{_labels(labels, le=bound)} {bucket_count}')
+                lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {count}')
+                lines.append(f'{name}_sum{_labels(labels)} {total}')
+                lines.append(f'{name}_count{_labels(labels)} {count}')
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels, **extra):
+    items = list(labels) + [(key, value) for key, value in extra.items()]
+    if not items:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + '}'
+
+
+REGISTRY = _Registry()
+REGISTRY.describe('nlabel_http_request_duration_seconds', 'histogram', 'İstek süresi (rota, metot, durum kodu)')
+REGISTRY.describe('nlabel_stage_duration_seconds', 'histogram', 'İç aşama süresi')
+REGISTRY.describe('nlabel_stage_rows_total', 'counter', 'Aşamanın işlediği satır sayısı')
+REGISTRY.describe('nlabel_stage_bytes_total', 'counter', 'Aşamanın okuduğu/ürettiği bayt sayısı')
+REGISTRY.describe('nlabel_stage_errors_total', 'counter', 'Hata ile biten aşama sayısı')
+
+
+class Span:
+    """Bir aşamanın ölçümü; blok içinde rows ve bytes alanları doldurulabilir."""
+
+    __slots__ = ('name', 'rows', 'bytes', 'seconds', 'error')
+
+    def __init__(self, name, rows=0, bytes=0):
+        self.name = name
+        self.rows = rows
+        self.bytes = bytes
+        self.seconds = 0.0
+        self.error = False
+
+
+def _record(span_):
+    labels = {'stage': span_.name}
+    REGISTRY.observe('nlabel_stage_duration_seconds', labels, span_.seconds)
+    REGISTRY.inc('nlabel_stage_rows_total', labels, span_.rows)
+    REGISTRY.inc('nlabel_stage_bytes_total', labels, span_.bytes)
+    if span_.error:
+        REGISTRY.inc('nlabel_stage_errors_total', labels)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append(span_)
+
+
+@contextmanager
+def span(name, rows=0, bytes=0):
+    """
+    Adlandırılmış aşama ölçümü:
+        with span('parquet_read') as s:
+            table = ...
+            s.rows, s.bytes = table.num_rows, table.nbytes
+    Hata ile biten aşama da süresiyle kaydedilir ve hata sayacı artar.
+    """
+    current = Span(name, rows, bytes)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        current.error = True
+        raise
+    finally:
+        current.seconds = time.perf_counter() - start
+        _record(current)
+
+
+def observe(name, seconds, rows=0, bytes=0):
+    """Süresi başka yerde ölçülmüş bir aşamayı kaydeder (ör. üreteçlerin her adımı)."""
+    current = Span(name, rows, bytes)
+    current.seconds = seconds
+    _record(current)
+
+
+def timed_batches(name, iterable, measure):
+    """
+    Üretecin her adımını ayrı aşama olarak kaydeder; measure(öğe) -> (satır, bayt).
+    Akış yanıtlarında üretim süresi tüketicinin bekleme süresinden ayrılmış olur.
+    """
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        rows, nbytes = measure(item)
+        observe(name, time.perf_counter() - start, rows, nbytes)
+        yield item
+
+
+def summarize_spans(spans):
+    """Aynı adlı aşamaları birleştirir: {ad: {'count', 'ms', 'rows', 'bytes', 'errors'}}"""
+    summary = {}
+    for item in spans:
+        entry = summary.setdefault(item.name, {'count': 0, 'ms': 0.0, 'rows': 0, 'bytes': 0, 'errors': 0})
+        entry['count'] += 1
+        entry['ms'] += item.seconds * 1000
+        entry['rows'] += item.rows
+        entry['bytes'] += item.bytes
+        entry['errors'] += item.error
+    for entry in summary.values():
+        entry['ms'] = round(entry['ms'], 3)
+    return summary
+
+
+class SamplingProfiler:
+    """
+    Hedef iş parçacığının yığınını interval saniyede bir örnekler (sys._current_frames).
+    Çıktı 'collapsed stack' biçimindedir (flamegraph.pl, speedscope ile açılabilir):
+        modül:fonksiyon;modül:fonksiyon örnek_sayısı
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+
+def init_app(app, logger=None):
+    """
+    Flask uygulamasına istek ölçümünü bağlar:
+    - her istek için rota/metot/durum etiketli süre histogramı ve tek satırlık JSON log
+      (aşamalar adlarına göre özetlenir); akış yanıtlarında ölçüm yanıt kapanınca biter
+    - Jinja şablon render süresi 'template_render' aşaması olarak
+    - app.config['PROFILING_ENABLED'] açıksa ?_profile=1 ile istenen isteğin örneklemeli profili
+      app.config['PROFILE_FOLDER'] içine yazılır, dosya adı X-Profile başlığında (akış yanıtlarında
+      yalnızca log satırında) döner
+    Log satırları verilmezse 'nlabel.requests' günlüğüne (stderr) yazılır.
+    """
+    from flask import before_render_template, g, request, template_rendered
+    if logger is None:
+        logger = logging.getLogger('nlabel.requests')
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+    @app.before_request
+    def _start_request():
+        g.metrics_start = time.perf_counter()
+        g.metrics_spans = []
+        _request_spans.set(g.metrics_spans)
+        g.metrics_profiler = None
+        if app.config.get('PROFILING_ENABLED') and request.args.get('_profile') == '1':
+            g.metrics_profiler = SamplingProfiler(threading.get_ident(),
+                                                  app.config.get('PROFILE_INTERVAL', 0.005)).start()
+
+    def finish(route, method, status, start, spans, profiler, response_bytes):
+        duration = time.perf_counter() - start
+        REGISTRY.observe('nlabel_http_request_duration_seconds',
+                         {'route': route, 'method': method, 'status': str(status)}, duration)
+        record = {'event': 'request', 'route': route, 'method': method, 'status': status,
+                  'duration_ms': round(duration * 1000, 3), 'response_bytes': response_bytes,
+                  'spans': summarize_spans(spans)}
+        if profiler is not None:
+            profiler.stop()
+            folder = app.config.get('PROFILE_FOLDER', 'profiles')
+            os.makedirs(folder, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{route.strip('/').replace('/', '_') or 'root'}-{os.getpid()}.txt"
+            with open(os.path.join(folder, name), 'w', encoding='utf-8') as f:
+                f.write(profiler.collapsed())
+            record['profile'] = name
+        logger.info(json.dumps(record, ensure_ascii=False))
+        return record
+
+    @app.after_request
+    def _finish_request(response):
+        if 'metrics_start' not in g:
+            return response
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        args = (route, request.method, response.status_code, g.metrics_start, g.metrics_spans, g.metrics_profiler)
+        if response.is_streamed:
+            # Gövde yanıt döndükten sonra üretilir; ölçüm yanıt kapanınca tamamlanır
+            response.call_on_close(lambda: finish(*args, None))
+            return response
+        record = finish(*args, response.calculate_content_length())
+        if 'profile' in record:
+            response.headers['X-Profile'] = record['profile']
+        return response
+
+    def _template_start(sender, template, context, **extra):
+        g.metrics_template_start = time.perf_counter()
+
+    def _template_done(sender, template, context, **extra):
+        start = g.pop('metrics_template_start', None)
+        if start is not None:
+            observe('template_render', time.perf_counter() - start)
+
+    before_render_template.connect(_template_start, app, weak=False)
+    template_rendered.connect(_template_done, app, weak=False)
@@ -0,0 +1,180 @@
+# qr_cache.py (İÇERİK ADRESLİ QR KOD ÖNBELLEĞİ: BELLEK + DİSK KATMANI)
+
+import hashlib
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from collections import OrderedDict
+from io import BytesIO
+from metrics import span
+
+
+def _new_qr(error_correction, **options):
+    """qrcode.QRCode; kütüphane ilk QR kodunda içe aktarılır (işçi açılış süresi)."""
+    import qrcode
+    level = getattr(qrcode.constants, f'ERROR_CORRECT_{error_correction}')
+    return qrcode.QRCode(error_correction=level, **options)
+
+
+def qr_cache_key(data, box_size=4, border=4, error_correction='L'):
+    """QR görüntüsünü belirleyen tüm parametrelerden türetilen anahtar (aynı zamanda ETag)."""
+    raw = f'{data}\0{box_size}\0{border}\0{error_correction}'.encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+def render_qr_png(data, box_size=4, border=4, error_correction='L'):
+    """QR matrisini oluşturup PNG baytlarını döndürür."""
+    with span('qr_encode_png', rows=1) as measured:
+        qr = _new_qr(error_correction, version=1, box_size=box_size, border=border)
+        qr.add_data(data)
+        qr.make(fit=True)
+        img = qr.make_image(fill_color="black", back_color="white")
+        buffer = BytesIO()
+        img.save(buffer, format="PNG")
+        measured.bytes = buffer.tell()
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=4096)
+def qr_svg_path(data, border=4, error_correction='L'):
+    """
+    QR matrisini modül biriminde tek bir SVG yolu olarak döndürür: (kenar uzunluğu, path d).
+    Her satırdaki koyu modül dizileri tek bir dikdörtgene birleştirilir; bu, qrcode'un
+    SvgPathImage çıktısından (modül başına bir dikdörtgen) belirgin şekilde daha kısadır.
+    """
+    with span('qr_encode_svg', rows=1) as measured:
+        qr = _new_qr(error_correction, version=1, border=border)
+        qr.add_data(data)
+        qr.make(fit=True)
+        matrix = qr.get_matrix()
+        commands = []
+        for y, row in enumerate(matrix):
+            x = 0
+            while x < len(row):
+                if row[x]:
+                    start = x
+                    while x < len(row) and row[x]:
+                        x += 1
+                    commands.append(f'M{start} {y}h{x - start}v1h-{x - start}z')
+                else:
+                    x += 1
+        path = ''.join(commands)
+        measured.bytes = len(path)
+    return len(matrix), path
+
+
+@lru_cache(maxsize=4096)
+def qr_module_count(data, error_correction='L'):
+    """
+    QR kodun kenar boşluğu hariç modül sayısı. Matris ve maske hesaplanmadan yalnızca
+    sürüm seçimi yapıldığından qr_svg_path'ten çok daha ucuzdur (yazıcı dilleri kodu kendisi çizer).
+    """
+    qr = _new_qr(error_correction)
+    qr.add_data(data)
+    return qr.best_fit() * 4 + 17
+
+
+class QRCache:
+    """
+    İki katmanlı QR önbelleği:
+    - Bellek: işçi (worker) başına LRU, en fazla memory_items kayıt
+    - Disk: tüm işçilerin paylaştığı klasör, toplam boyut max_disk_bytes'ı aşınca
+      en uzun süredir kullanılmayan dosyalar silinir
+    """
+
+    def __init__(self, folder, memory_items=2048, max_disk_bytes=256 * 1024 * 1024):
+        self.folder = folder
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+
+    def _path(self, key):
+        return os.path.join(self.folder, f'{key}.png')
+
+    def _remember(self, key, png):
+        with self._lock:
+            self._memory[key] = png
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                png = f.read()
+            os.utime(path) # LRU tahliyesi için son kullanım zamanını güncelle
+            return png
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key, png):
+        # Yarım yazılmış dosya okunmasın diye önce geçici dosyaya yazıp yerine taşı
+        fd, temp_path = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(png)
+        os.replace(temp_path, self._path(key))
+        with self._lock:
+            self._disk_bytes += len(png)
+            over_limit = self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self.evict()
+
+    def evict(self):
+        """Disk katmanını sınırın %90'ına inene kadar en eski dosyalardan başlayarak küçültür."""
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name.endswith('.png'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+
+    def get(self, data, box_size=4, border=4, error_correction='L'):
+        """(anahtar, PNG baytları) döndürür; sırasıyla bellek, disk ve yeniden üretim denenir."""
+        key = qr_cache_key(data, box_size, border, error_correction)
+        with self._lock:
+            png = self._memory.get(key)
+            if png is not None:
+                self._memory.move_to_end(key)
+                return key, png
+
+        png = self._read_disk(key)
+        if png is None:
+            png = render_qr_png(data, box_size, border, error_correction)
+            self._write_disk(key, png)
+        self._remember(key, png)
+        return key, png
+
+    def pregenerate(self, values, box_size=4, border=4, error_correction='L', on_progress=None):
+        """
+        Verilen değerlerin (tekrarlar bir kez) QR görüntülerini disk katmanına önceden yazar.
+        on_progress(işlenen, toplam) her 100 değerde bir çağrılır.
+        """
+        unique_values = list(dict.fromkeys(values))
+        generated = 0
+        for i, data in enumerate(unique_values, start=1):
+            key = qr_cache_key(data, box_size, border, error_correction)
+            if not os.path.exists(self._path(key)):
+                try:
+                    self._write_disk(key, render_qr_png(data, box_size, border, error_correction))
+                    generated += 1
+                except Exception:
+                    pass # Kodlanamayan değer önizlemede yine 204 ile sonuçlanır
+            if on_progress and (i % 100 == 0 or i == len(unique_values)):
+                on_progress(i, len(unique_values))
+        return generated
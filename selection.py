@@ -0,0 +1,64 @@
+# selection.py (SATIR SEÇİMİNİ ARALIK LİSTESİ OLARAK SAKLAMA: "0-99,150,200-299")
+
+import json
+import os
+import numpy as np
+
+
+def parse_ranges(text, row_count=None):
+    """
+    "0-99,150,200-299" biçimindeki seçimi sıralı ve tekrarsız satır numaralarına çevirir.
+    Aralıkların iki ucu da dahildir. Geçersiz biçimde ValueError; row_count verilirse veri
+    dışına taşan aralıkta, satır dizisi hiç oluşturulmadan IndexError.
+    """
+    bounds = []
+    for token in (text or '').split(','):
+        token = token.strip()
+        if not token:
+            continue
+        start, _, end = token.partition('-')
+        start = int(start)
+        end = int(end) if end else start
+        if start < 0 or end < start:
+            raise ValueError(f"Geçersiz seçim aralığı: {token}")
+        if row_count is not None and end >= row_count:
+            raise IndexError(f"Seçim aralığı veri dışında: {token}")
+        bounds.append((start, end))
+    if not bounds:
+        return np.empty(0, dtype=np.int64)
+
+    # Çakışan/bitişik aralıklar birleştirilir; ayrılan bellek seçilen satır sayısıyla sınırlı kalır
+    merged = []
+    for start, end in sorted(bounds):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return np.concatenate([np.arange(start, end + 1, dtype=np.int64) for start, end in merged])
+
+
+def format_ranges(indices):
+    """Satır numaralarını parse_ranges'in okuduğu kısa aralık biçimine çevirir."""
+    indices = np.unique(np.asarray(indices, dtype=np.int64))
+    if not len(indices):
+        return ''
+    # Ardışıklığın bozulduğu yerler aralık sınırlarıdır
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    starts = np.concatenate(([indices[0]], indices[breaks]))
+    ends = np.concatenate((indices[breaks - 1], [indices[-1]]))
+    return ','.join(str(start) if start == end else f'{start}-{end}' for start, end in zip(starts, ends))
+
+
+def save_selection(path, data_uuid, indices):
+    """Yazdırma işinin seçimini kaynak veri kimliğiyle birlikte küçük bir JSON dosyasına yazar."""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'data_uuid': data_uuid, 'ranges': format_ranges(indices)}, f)
+    os.replace(temp_path, path)
+
+
+def load_selection(path):
+    """save_selection ile yazılmış seçimi okur. Dönüş: (data_uuid, satır numaraları)"""
+    with open(path, encoding='utf-8') as f:
+        selection = json.load(f)
+    return selection['data_uuid'], parse_ranges(selection['ranges'])
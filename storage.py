@@ -0,0 +1,188 @@
+# storage.py (UPLOAD KLASÖRÜ YAŞAM DÖNGÜSÜ: KOTA, TTL/LRU TEMİZLİĞİ, İÇERİK ÖZETİ)
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+
+# uploads/ içindeki dosya türleri (qr_cache klasörü kendi disk sınırıyla yönetilir; .sqlite3 dosyalarındaki
+# eski iş ve şablon kayıtları reap() içinde TTL ile silinir)
+_DATA_FILE = re.compile(r'^([0-9a-f-]{36})\.parquet$')
+_PRINT_FILE = re.compile(r'^([0-9a-f-]{36})_(?:selection\.json|labels\.html)(?:\.tmp)?$')
+_UPLOAD_TEMP_FILE = re.compile(r'^[0-9a-f-]{36}_.+\.(?:csv|xlsx)$', re.IGNORECASE)
+
+
+def save_upload(file_storage, path, chunk_size=1024 * 1024):
+    """Yüklenen dosyayı diske parça parça yazar ve içeriğin SHA-256 özetini döndürür."""
+    digest = hashlib.sha256()
+    with open(path, 'wb') as f:
+        while True:
+            chunk = file_storage.stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+
+class StorageManager:
+    """
+    uploads/ klasöründeki veri Parquet'lerini ve yazdırma işi dosyalarını yönetir:
+    - TTL: ttl saniyedir kullanılmayan veri ve yazdırma dosyaları silinir
+    - Kota: veri + yazdırma dosyaları max_bytes'ı aşarsa en uzun süredir kullanılmayanlardan
+      başlayarak sınırın %90'ına inilir (son min_age saniyede kullanılanlara dokunulmaz)
+    - Kayıtlar: ttl saniyedir güncellenmeyen iş kayıtları (jobs) ve kullanılmayan şablonlar silinir
+    Temizlik arka plandaki bir iş parçacığında interval saniyede bir çalışır; istekleri bekletmez.
+    Birden çok işçi aynı klasörü temizleyebilir, silme işlemleri birbirini bozmaz.
+    """
+
+    def __init__(self, folder, store, max_bytes=5 * 1024 ** 3, ttl=7 * 24 * 3600, min_age=10 * 60,
+                 interval=10 * 60, on_delete=None, jobs=None):
+        self.folder = folder
+        self.store = store # Veri kayıtları ve son kullanım zamanları (TemplateStore)
+        self.jobs = jobs # İş kayıtları (JobQueue); verilmezse iş tablosuna dokunulmaz
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.min_age = min_age
+        self.interval = interval
+        self.on_delete = on_delete # on_delete(yol): silinen veri dosyası için (ör. tablo önbelleğinden atmak)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _scan(self):
+        """
+        Klasördeki yönetilen dosyaları gruplar.
+        Dönüş: [(son kullanım, toplam boyut, tür, kimlik, [yollar])]
+        """
+        last_used = self.store.dataset_last_used()
+        groups = {}
+        for entry in os.scandir(self.folder):
+            if not entry.is_file():
+                continue
+            match = _DATA_FILE.match(entry.name)
+            kind = 'data'
+            if not match:
+                match = _PRINT_FILE.match(entry.name)
+                kind = 'print'
+            if not match:
+                if _UPLOAD_TEMP_FILE.match(entry.name):
+                    # Yarıda kalmış yükleme: kimliği dosya adının kendisi
+                    match, kind = None, 'upload'
+                else:
+                    continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            item_id = match.group(1) if match else entry.name
+            group = groups.setdefault((kind, item_id), [stat.st_mtime, 0, []])
+            group[0] = max(group[0], stat.st_mtime)
+            group[1] += stat.st_size
+            group[2].append(entry.path)
+
+        items = []
+        for (kind, item_id), (mtime, size, paths) in groups.items():
+            if kind == 'data':
+                mtime = max(mtime, last_used.get(item_id, 0))
+            items.append((mtime, size, kind, item_id, paths))
+        return items
+
+    def _delete(self, kind, item_id, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            if kind == 'data' and self.on_delete:
+                self.on_delete(path)
+        if kind == 'data':
+            self.store.delete_dataset(item_id)
+
+    def reap(self):
+        """
+        TTL ve kota kurallarını bir kez uygular.
+        Dönüş: {'deleted': dosya grubu sayısı, 'freed_bytes', 'deleted_jobs', 'deleted_templates'}
+        """
+        with self._lock:
+            now = time.time()
+            deleted_jobs = self.jobs.delete_older_than(now - self.ttl) if self.jobs else 0
+            deleted_templates = self.store.delete_templates_older_than(now - self.ttl)
+            items = self._scan()
+            deleted = freed = 0
+            remaining = []
+            for item in items:
+                last_used, size, kind, item_id, paths = item
+                # Yarım yüklemeler bir saatte, diğerleri TTL sonunda silinir
+                expires_after = min(self.ttl, 3600) if kind == 'upload' else self.ttl
+                if now - last_used > expires_after:
+                    self._delete(kind, item_id, paths)
+                    deleted += 1
+                    freed += size
+                else:
+                    remaining.append(item)
+
+            total = sum(item[1] for item in remaining)
+            if total > self.max_bytes:
+                target = self.max_bytes * 0.9
+                for last_used, size, kind, item_id, paths in sorted(remaining):
+                    if total <= target or now - last_used < self.min_age:
+                        break
+                    self._delete(kind, item_id, paths)
+                    total -= size
+                    deleted += 1
+                    freed += size
+            return {'deleted': deleted, 'freed_bytes': freed,
+                    'deleted_jobs': deleted_jobs, 'deleted_templates': deleted_templates}
+
+    def stats(self):
+        """Disk kullanımı: yönetilen dosyalar tür bazında, diğer dosyalar ve diskteki boş alan."""
+        usage = {kind: {'count': 0, 'bytes': 0} for kind in ('data', 'print', 'upload')}
+        for _, size, kind, _, _ in self._scan():
+            usage[kind]['count'] += 1
+            usage[kind]['bytes'] += size
+        other_bytes = 0
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                path = os.path.join(root, name)
+                if root != self.folder or not (_DATA_FILE.match(name) or _PRINT_FILE.match(name)
+                                                or _UPLOAD_TEMP_FILE.match(name)):
+                    try:
+                        other_bytes += os.path.getsize(path)
+                    except FileNotFoundError:
+                        pass
+        managed_bytes = sum(kind['bytes'] for kind in usage.values())
+        disk = shutil.disk_usage(self.folder)
+        return {
+            'managed_bytes': managed_bytes,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'datasets': usage['data'],
+            'print_jobs': usage['print'],
+            'incomplete_uploads': usage['upload'],
+            'other_bytes': other_bytes, # QR önbelleği, SQLite dosyaları
+            'disk_free_bytes': disk.free,
+            'disk_total_bytes': disk.total,
+        }
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reap()
+            except Exception:
+                pass # Bir sonraki turda yeniden denenir
+
+    def start(self):
+        """Arka plan temizlik iş parçacığını başlatır (süreç başına bir kez)."""
+        if self._thread is not None:
+            return # Her istekte çağrılır; başladıktan sonra (uzun sürebilen) reap kilidini beklemez
+        with self._lock:
+            # Aynı anda gelen ilk istekler ikinci bir iş parçacığı başlatmasın
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='storage-reaper', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,166 @@
+# table_query.py (PARQUET VERİSİ ÜZERİNDE SAYFALAMA, SIRALAMA VE FİLTRELEME)
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from metrics import span
+
+MAX_PAGE_LENGTH = 1000 # Tek istekte döndürülecek en fazla satır
+
+
+def data_columns(parquet_file):
+    """Parquet şemasındaki veri sütunları (pandas'ın index sütunları hariç)."""
+    return [name for name in parquet_file.schema_arrow.names if not name.startswith('__index_level_')]
+
+
+def _locate_rows(parquet_file, indices):
+    """
+    Satır numaralarının hangi row group'ta olduğunu bulur; aralık dışı numarada IndexError.
+    Dönüş: (indices, her satırın row group'u, row group boyutları, row group başlangıçları)
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    metadata = parquet_file.metadata
+    group_sizes = np.array([metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)], dtype=np.int64)
+    group_ends = np.cumsum(group_sizes)
+    group_starts = group_ends - group_sizes
+
+    if len(indices) and (indices.min() < 0 or indices.max() >= metadata.num_rows):
+        raise IndexError("Satır numarası veri aralığının dışında.")
+
+    return indices, np.searchsorted(group_ends, indices, side='right'), group_sizes, group_starts
+
+
+def _local_positions(indices, row_groups, needed, group_sizes, group_starts):
+    """Satırların, needed row group'larının sırayla birleştirildiği tablodaki konumları."""
+    concat_starts = np.zeros(len(group_sizes), dtype=np.int64)
+    concat_starts[needed] = np.cumsum(group_sizes[needed]) - group_sizes[needed]
+    return pa.array(concat_starts[row_groups] + (indices - group_starts[row_groups]))
+
+
+def take_rows(parquet_file, indices, columns=None):
+    """
+    Verilen satır numaralarını (sırası korunarak) yalnızca bu satırları içeren
+    row group'ları okuyarak döndürür.
+    """
+    indices, row_groups, group_sizes, group_starts = _locate_rows(parquet_file, indices)
+    needed = np.unique(row_groups)
+    with span('parquet_take', rows=len(indices)) as measured:
+        table = parquet_file.read_row_groups(needed.tolist(), columns=columns)
+        measured.bytes = table.nbytes
+    return table.take(_local_positions(indices, row_groups, needed, group_sizes, group_starts))
+
+
+def iter_take_rows(parquet_file, indices, batch_rows, columns=None):
+    """
+    take_rows'un parçalı hali: satırları (sırası korunarak) batch_rows'luk tablolar halinde verir.
+    Her row group yalnızca bir kez çözülür ve son kullanıldığı parçadan sonra bırakılır; büyük
+    row group'lu dosyalarda parça başına take_rows'un aynı grubu tekrar tekrar çözmesini önler.
+    """
+    indices, row_groups, group_sizes, group_starts = _locate_rows(parquet_file, indices)
+    last_used = {}
+    for position, group in enumerate(row_groups.tolist()):
+        last_used[group] = position
+    decoded = {}
+    for start in range(0, len(indices), batch_rows):
+        batch_groups = row_groups[start:start + batch_rows]
+        needed = np.unique(batch_groups)
+        missing = [group for group in needed.tolist() if group not in decoded]
+        if missing:
+            with span('parquet_take', rows=int(group_sizes[missing].sum())) as measured:
+                for group in missing:
+                    decoded[group] = parquet_file.read_row_group(group, columns=columns)
+                measured.bytes = sum(decoded[group].nbytes for group in missing)
+
+        # Bu parçanın row group'ları birleştirilip yerel konumlarla seçilir
+        table = pa.concat_tables([decoded[group] for group in needed.tolist()])
+        yield table.take(_local_positions(indices[start:start + batch_rows], batch_groups, needed,
+                                          group_sizes, group_starts))
+
+        end = start + len(batch_groups)
+        for group in needed.tolist():
+            if last_used[group] < end:
+                del decoded[group]
+
+
+def _smart_match(column, value):
+    """DataTables'ın "smart" aramasına benzer: boşlukla ayrılan her kelime hücrede geçmeli (büyük/küçük harf duyarsız)."""
+    mask = None
+    for term in value.split():
+        term_mask = pc.match_substring(column, term, ignore_case=True)
+        mask = term_mask if mask is None else pc.and_(mask, term_mask)
+    return mask
+
+
+def query_page(parquet_path, start=0, length=50, search='', column_filters=None, order=None, table=None):
+    """
+    Parquet dosyasından tek bir sayfa döndürür.
+    column_filters: {sütun_adı: arama metni}, order: (sütun_adı, 'asc' | 'desc') veya None
+    table verilirse (önbellekteki Arrow tablosu) dosya hiç okunmaz. Aksi halde filtre ve
+    sıralama yalnızca ilgili sütunlar okunarak hesaplanır; sayfa satırları ise yalnızca
+    o satırları içeren row group'lardan alınır.
+    Dönüş: {'total', 'filtered', 'indices', 'rows'}
+    """
+    if table is None:
+        parquet_file = pq.ParquetFile(parquet_path)
+        columns = data_columns(parquet_file)
+        total = parquet_file.metadata.num_rows
+    else:
+        parquet_file = None
+        columns = [name for name in table.column_names if not name.startswith('__index_level_')]
+        total = table.num_rows
+    length = max(0, min(length, MAX_PAGE_LENGTH))
+    start = max(0, start)
+
+    column_filters = {name: value for name, value in (column_filters or {}).items() if name in columns and value.strip()}
+    search = (search or '').strip()
+    if order and order[0] not in columns:
+        order = None
+
+    if not column_filters and not search and not order:
+        # Filtre/sıralama yok: sadece sayfanın satırları alınır
+        indices = np.arange(start, min(start + length, total), dtype=np.int64)
+        filtered = total
+    else:
+        needed = set(column_filters)
+        if search:
+            needed.update(columns)
+        if order:
+            needed.add(order[0])
+        needed_columns = [name for name in columns if name in needed]
+        projected = table.select(needed_columns) if table is not None else parquet_file.read(columns=needed_columns)
+
+        mask = None
+        for name, value in column_filters.items():
+            column_mask = _smart_match(projected[name], value)
+            mask = column_mask if mask is None else pc.and_(mask, column_mask)
+        for term in search.split():
+            # Genel arama: her kelime herhangi bir sütunda geçmeli
+            term_mask = None
+            for name in columns:
+                match = pc.match_substring(projected[name], term, ignore_case=True)
+                term_mask = match if term_mask is None else pc.or_(term_mask, match)
+            mask = term_mask if mask is None else pc.and_(mask, term_mask)
+
+        if mask is not None:
+            candidates = np.flatnonzero(pc.fill_null(mask, False).to_numpy(zero_copy_only=False))
+        else:
+            candidates = np.arange(total, dtype=np.int64)
+        filtered = len(candidates)
+
+        if order:
+            sort_values = projected[order[0]].take(pa.array(candidates))
+            direction = 'descending' if order[1] == 'desc' else 'ascending'
+            sorted_positions = pc.array_sort_indices(sort_values, order=direction)
+            candidates = candidates[sorted_positions.to_numpy()]
+        indices = candidates[start:start + length]
+
+    if not len(indices):
+        rows = []
+    else:
+        if table is not None:
+            page = table.select(columns).take(pa.array(indices))
+        else:
+            page = take_rows(parquet_file, indices, columns=columns)
+        rows = [list(values) for values in zip(*(page.column(name).to_pylist() for name in columns))]
+    return {'total': total, 'filtered': filtered, 'indices': indices.tolist(), 'rows': rows}
@@ -0,0 +1,144 @@
+# template_store.py (SUNUCU TARAFLI ŞABLON VE VERİ KÜMESİ BİLGİSİ DEPOSU: SQLITE + SÜRÜMLEME)
+
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY,
+    columns TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    content_hash TEXT,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS datasets_content_hash ON datasets (content_hash);
+CREATE TABLE IF NOT EXISTS templates (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS template_versions (
+    template_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    rows TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (template_id, version)
+);
+'''
+
+
+class TemplateStore:
+    """
+    Etiket şablonlarını ve yüklenen verilerin sütun bilgisini SQLite'ta tutar; oturumda
+    (cookie) yalnızca kimlikler kalır. Her kayıt şablonun yeni bir sürümünü oluşturur,
+    böylece sürüm numarası derlenmiş şablon ve önceden render edilmiş etiketler için
+    geçerlilik anahtarı olarak kullanılabilir. Şablon başına son keep_versions sürüm saklanır.
+    """
+
+    def __init__(self, db_path, keep_versions=20):
+        self.db_path = db_path
+        self.keep_versions = keep_versions
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """İşlem sonunda commit edip bağlantıyı kapatan kısa ömürlü bağlantı."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Veri kümeleri ---
+
+    def save_dataset(self, data_uuid, columns, row_count, content_hash=None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO datasets (id, columns, row_count, content_hash, created_at, last_used) '
+                         'VALUES (?, ?, ?, ?, ?, ?)',
+                         (data_uuid, json.dumps(columns, ensure_ascii=False), row_count, content_hash, now, now))
+
+    def find_dataset(self, content_hash):
+        """Aynı içerikle daha önce yüklenmiş verinin kimliği (en yenisi); yoksa None."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT id FROM datasets WHERE content_hash = ? ORDER BY created_at DESC LIMIT 1',
+                               (content_hash,)).fetchone()
+        return row['id'] if row else None
+
+    def touch_dataset(self, data_uuid):
+        """Son kullanım zamanını günceller (depolama temizliğinde LRU sırası için)."""
+        with self._connect() as conn:
+            conn.execute('UPDATE datasets SET last_used = ? WHERE id = ?', (time.time(), data_uuid))
+
+    def dataset_last_used(self):
+        """{veri kimliği: son kullanım zamanı}"""
+        with self._connect() as conn:
+            return {row['id']: row['last_used'] for row in conn.execute('SELECT id, last_used FROM datasets')}
+
+    def get_dataset(self, data_uuid):
+        """{'columns', 'row_count'} ya da kayıt yoksa None."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT columns, row_count FROM datasets WHERE id = ?', (data_uuid,)).fetchone()
+        if row is None:
+            return None
+        return {'columns': json.loads(row['columns']), 'row_count': row['row_count']}
+
+    def delete_dataset(self, data_uuid):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM datasets WHERE id = ?', (data_uuid,))
+
+    # --- Şablonlar ---
+
+    # templates.updated_at son kayıt ya da kullanım zamanıdır; kullanılan şablon günde en fazla bir kez
+    # güncellenir (her okumada yazma yapılmasın diye) ve delete_templates_older_than'dan korunur
+    TOUCH_INTERVAL = 24 * 3600
+
+    def get_template(self, template_id, version=None):
+        """(sürüm, hücre listesi) döndürür; version verilmezse son sürüm. Şablon yoksa (0, [])."""
+        with self._connect() as conn:
+            if version is None:
+                row = conn.execute('SELECT version, updated_at FROM templates WHERE id = ?', (template_id,)).fetchone()
+                if row is None:
+                    return 0, []
+                version = row['version']
+                now = time.time()
+                if now - row['updated_at'] > self.TOUCH_INTERVAL:
+                    conn.execute('UPDATE templates SET updated_at = ? WHERE id = ?', (now, template_id))
+            row = conn.execute('SELECT rows FROM template_versions WHERE template_id = ? AND version = ?',
+                               (template_id, version)).fetchone()
+        if row is None:
+            return 0, []
+        return version, json.loads(row['rows'])
+
+    def delete_templates_older_than(self, cutoff):
+        """cutoff zamanından beri kaydedilmeyen ve kullanılmayan şablonları tüm sürümleriyle siler."""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM template_versions WHERE template_id IN '
+                         '(SELECT id FROM templates WHERE updated_at < ?)', (cutoff,))
+            return conn.execute('DELETE FROM templates WHERE updated_at < ?', (cutoff,)).rowcount
+
+    def save_template(self, template_id, template_rows):
+        """
+        Şablonun yeni sürümünü kaydeder. template_id None ise yeni şablon oluşturulur.
+        Dönüş: (template_id, yeni sürüm)
+        """
+        template_id = template_id or str(uuid.uuid4())
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute('SELECT version FROM templates WHERE id = ?', (template_id,)).fetchone()
+            version = (row['version'] if row else 0) + 1
+            conn.execute('INSERT OR REPLACE INTO templates (id, version, updated_at) VALUES (?, ?, ?)',
+                         (template_id, version, now))
+            conn.execute('INSERT INTO template_versions (template_id, version, rows, created_at) VALUES (?, ?, ?, ?)',
+                         (template_id, version, json.dumps(template_rows, ensure_ascii=False), now))
+            conn.execute('DELETE FROM template_versions WHERE template_id = ? AND version <= ?',
+                         (template_id, version - self.keep_versions))
+        return template_id, version
@@ -0,0 +1,60 @@
+# warmup.py (ÇATALLAMADAN ÖNCE ISINMA: AĞIR KÜTÜPHANELERİ VE VERİ YOLLARINI ANA SÜREÇTE BİR KEZ ÇALIŞTIRMA)
+
+import os
+import tempfile
+import time
+import metrics
+from ingest import csv_to_parquet, sniff_csv, xlsx_to_parquet
+from label_render import render_rows
+from qr_cache import render_qr_png
+from table_query import query_page
+from zpl_render import iter_zpl
+
+# Isınmada render edilen şablon: metin, renk sütunu, barkod ve iki QR biçimi
+WARMUP_TEMPLATE = [
+    {'type': 'static_text', 'content': 'ETİKET', 'col_span': 6, 'row_span': 1, 'height_val': '30px', 'size': '16px'},
+    {'type': 'qrcode', 'name': 'Kod', 'qr_render': 'svg', 'col_span': 2, 'row_span': 2, 'height_val': '80px', 'size': '12px'},
+    {'type': 'qrcode', 'name': 'Kod', 'qr_render': 'symbol', 'col_span': 2, 'row_span': 2, 'height_val': '80px', 'size': '12px'},
+    {'type': 'text', 'name': 'Ad', 'col_span': 2, 'row_span': 1, 'height_val': '40px', 'size': '14px', 'bgcolor_col': 'Renk'},
+    {'type': 'barcode_text', 'name': 'Kod', 'col_span': 2, 'row_span': 1, 'height_val': '40px', 'size': '12px'},
+]
+
+
+def warmup():
+    """
+    CSV (pyarrow ve pandas yolu), XLSX, Parquet okuma/sorgu, HTML ve ZPL etiket render'ı ile
+    QR kodlama yollarını küçük bir örnek veriyle bir kez çalıştırır. gunicorn --preload ile ana
+    süreçte çağrıldığında içe aktarılan modüller ve ilk kullanımda kurulan tablolar işçilere
+    yazma-anında-kopyalama ile paylaşılır; ilk yükleme ve ilk önizleme bu bedeli ödemez.
+    İş parçacığı ya da süreç havuzu başlatmaz. Dönüş: süre (saniye)
+    """
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='nlabel-warmup-') as folder:
+        csv_path = os.path.join(folder, 'ornek.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write('Ad;Kod;Renk\nçilek;K-1;red\nşeker;K-2;#00ff00\n')
+        parquet_path = os.path.join(folder, 'ornek.parquet')
+        csv_to_parquet(csv_path, parquet_path, sniff_csv(csv_path))
+
+        # Tekrar eden başlık pandas yolunu çalıştırır
+        duplicate_path = os.path.join(folder, 'tekrar.csv')
+        with open(duplicate_path, 'w', encoding='utf-8') as f:
+            f.write('Ad;Ad\na;b\n')
+        csv_to_parquet(duplicate_path, os.path.join(folder, 'tekrar.parquet'), sniff_csv(duplicate_path))
+
+        import openpyxl
+        workbook = openpyxl.Workbook()
+        workbook.active.append(['Ad', 'Kod'])
+        workbook.active.append(['çilek', 'K-1'])
+        xlsx_path = os.path.join(folder, 'ornek.xlsx')
+        workbook.save(xlsx_path)
+        xlsx_to_parquet(xlsx_path, os.path.join(folder, 'ornek_xlsx.parquet'))
+
+        query_page(parquet_path, search='çi', column_filters={'Kod': 'K'}, order=('Ad', 'desc'))
+        render_rows(parquet_path, WARMUP_TEMPLATE, '/qrcode/')
+        ''.join(iter_zpl(parquet_path, WARMUP_TEMPLATE))
+        render_qr_png('K-1')
+
+    # Isınma ölçümleri işçilerin /metrics çıktısına karışmasın
+    metrics.REGISTRY.clear()
+    return time.perf_counter() - start
@@ -0,0 +1,194 @@
+# zpl_render.py (ETİKET ŞABLONUNDAN ZPL YAZICI DİLİ ÇIKTISI: TÜM İŞ İÇİN TEK DOSYA)
+
+import re
+import pyarrow.parquet as pq
+from label_render import RENDER_BATCH_ROWS, as_text, merge_static_parts, plan_columns, prepare_batch, render_labels
+from metrics import timed_batches
+from qr_cache import qr_module_count
+from table_query import data_columns, iter_take_rows
+
+ZPL_DPI_CHOICES = (203, 300, 600) # Zebra yazıcı kafası çözünürlükleri (8, 12, 24 nokta/mm)
+GRID_COLUMNS = 6 # print_preview.html'deki etiket-grid ile aynı
+CSS_PX_PER_INCH = 96
+CELL_PADDING_PX = 5 # .label-cell padding
+CELL_BORDER_PX = 1 # .label-cell kenarlığı
+LABEL_BORDER_PX = 2 # .etiket-kutu kenarlığı
+
+_CSS_LENGTH = re.compile(r'^\s*([0-9]*\.?[0-9]+)\s*(px|pt|mm|cm|in)?\s*$', re.IGNORECASE)
+_UNIT_PER_INCH = {'px': CSS_PX_PER_INCH, 'pt': 72, 'mm': 25.4, 'cm': 2.54, 'in': 1}
+
+
+def css_to_dots(value, dpi, default_px):
+    """'40px', '12pt', '1cm' gibi CSS uzunluklarını yazıcı noktasına çevirir; okunamazsa default_px kullanılır."""
+    match = _CSS_LENGTH.match(str(value or ''))
+    number, unit = (float(match.group(1)), (match.group(2) or 'px').lower()) if match else (default_px, 'px')
+    return max(1, round(number * dpi / _UNIT_PER_INCH[unit]))
+
+
+def zpl_field_data(text):
+    """
+    Alan verisini ^FH ile onaltılık kaçışlı yazar: '^' ve '~' komut karakteri olduğundan,
+    '_' ise kaçış karakteri olduğundan kodlanır. Metin UTF-8'dir (^CI28).
+    """
+    escaped = ''.join(f'_{ord(char):02X}' if char in '^~_' else char for char in text)
+    return f'^FH_^FD{escaped}^FS'
+
+
+def layout_grid(template_rows):
+    """
+    Hücreleri CSS Grid'in otomatik yerleşimiyle (satır öncelikli, 6 sütun) yerleştirir.
+    Dönüş: ([(hücre, sütun, satır, sütun_genişliği, satır_genişliği)], satır sayısı)
+    """
+    occupied = set()
+    placements = []
+    cursor_row, cursor_col = 0, 0
+    for item in template_rows:
+        col_span = min(max(int(item.get('col_span', 1) or 1), 1), GRID_COLUMNS)
+        row_span = max(int(item.get('row_span', 1) or 1), 1)
+        row, col = cursor_row, cursor_col
+        while True:
+            if col + col_span > GRID_COLUMNS:
+                row, col = row + 1, 0
+                continue
+            cells = {(r, c) for r in range(row, row + row_span) for c in range(col, col + col_span)}
+            if not cells & occupied:
+                break
+            col += 1
+        occupied |= cells
+        placements.append((item, col, row, col_span, row_span))
+        cursor_row, cursor_col = row, col + col_span
+    row_count = max((row + row_span for _, _, row, _, row_span in placements), default=0)
+    return placements, row_count
+
+
+def _text_field(x, y, width, height, font_dots, align):
+    """Metni hücre kutusuna sığan satır sayısıyla ^FB bloğu olarak yazar."""
+    max_lines = max(1, height // font_dots)
+    head = f'^FO{x},{y}^A0N,{font_dots}^FB{width},{max_lines},0,{align},0'
+
+    def build(values):
+        return [head + zpl_field_data(text) for text in as_text(values)]
+    return build
+
+
+def _code128_encodable(text):
+    """Code 128 (B alt kümesi) yalnızca yazdırılabilir ASCII karakterleri kodlar; Türkçe harfler kodlanamaz."""
+    return bool(text) and all(' ' <= char <= '~' for char in text)
+
+
+def _barcode_field(x, y, width, height, font_dots):
+    """
+    Code 128 barkod, altında okunabilir metin ile; genişlik tahminiyle hücrede ortalanır.
+    Kodlanamayan (ASCII dışı) ya da en ince çubukla da hücreye sığmayan değerler, HTML
+    önizlemedeki gibi ortalanmış metin olarak yazılır.
+    """
+    bar_height = max(10, height - font_dots - 4)
+    as_plain_text = _text_field(x, y, width, height, font_dots, 'C')
+
+    def build(values):
+        texts = as_text(values)
+        fields = as_plain_text(texts)
+        for i, text in enumerate(texts):
+            if not _code128_encodable(text):
+                continue
+            for module in (2, 1):
+                estimated = (11 * len(text) + 35) * module
+                if estimated <= width:
+                    offset = (width - estimated) // 2
+                    fields[i] = f'^FO{x + offset},{y}^BY{module}^BCN,{bar_height},Y,N,N' + zpl_field_data(text)
+                    break
+        return fields
+    return build
+
+
+def _qr_field(x, y, width, height):
+    """QR kod; büyütme oranı, kodun hücreye sığacağı en büyük değer (1-10) olarak değer başına seçilir."""
+    def build(values):
+        fields = []
+        for text in as_text(values):
+            try:
+                modules = qr_module_count(text)
+            except Exception:
+                fields.append('') # Kodlanamayan değer: HTML önizlemedeki boş görüntü gibi
+                continue
+            magnification = min(10, max(1, min(width, height) // modules))
+            offset_x = max(0, (width - modules * magnification) // 2)
+            offset_y = max(0, (height - modules * magnification) // 2)
+            fields.append(f'^FO{x + offset_x},{y + offset_y}^BQN,2,{magnification}'
+                          + zpl_field_data(f'LA,{text}'))
+        return fields
+    return build
+
+
+def compile_zpl(template_rows, dpi=203, width_mm=100):
+    """
+    Şablon ızgarasını ZPL render planına çevirir (label_render.render_labels ile aynı plan biçimi:
+    sabit komutlar ve ('value', sütun_adı, dönüştürücü) parçaları). Her etiket ayrı ^XA...^XZ bloğudur.
+    Hücre kenarlıkları ve etiket çerçevesi HTML önizlemedeki gibi çizilir. Termal yazıcılar tek renkli
+    olduğundan renk, kalın/italik ve logo hücreleri yok sayılır.
+    """
+    placements, row_count = layout_grid(template_rows)
+    label_width = round(width_mm * dpi / 25.4)
+    column_width = label_width // GRID_COLUMNS
+    padding = css_to_dots(f'{CELL_PADDING_PX}px', dpi, CELL_PADDING_PX)
+    cell_border = css_to_dots(f'{CELL_BORDER_PX}px', dpi, CELL_BORDER_PX)
+    label_border = css_to_dots(f'{LABEL_BORDER_PX}px', dpi, LABEL_BORDER_PX)
+
+    # Satır yükseklikleri: hücrelerin min-height değerleri kapladıkları satırlara bölünür
+    row_heights = [1] * row_count
+    for item, _, row, _, row_span in placements:
+        height = css_to_dots(item.get('height_val', '40px'), dpi, 40)
+        for r in range(row, row + row_span):
+            row_heights[r] = max(row_heights[r], -(-height // row_span))
+    row_tops = [sum(row_heights[:r]) for r in range(row_count + 1)]
+    label_height = row_tops[-1] + 2 * label_border
+
+    plan = [f'^XA^CI28^PW{label_width}^LL{label_height}^LH0,0'
+            f'^FO0,0^GB{label_width},{label_height},{label_border}^FS']
+
+    def static(text):
+        plan.append(text)
+
+    def dynamic(column_name, builder):
+        plan.append(('value', column_name, builder))
+
+    for item, col, row, col_span, row_span in placements:
+        x = label_border + col * column_width
+        y = label_border + row_tops[row]
+        width = min(col_span * column_width, label_width - 2 * label_border - col * column_width)
+        height = row_tops[row + row_span] - row_tops[row]
+        static(f'^FO{x},{y}^GB{width},{height},{cell_border}^FS')
+
+        inner_x, inner_y = x + padding, y + padding
+        inner_width, inner_height = max(1, width - 2 * padding), max(1, height - 2 * padding)
+        font_dots = css_to_dots(item.get('size', '12px'), dpi, 12)
+        item_type = item.get('type')
+
+        if item_type == 'static_text':
+            static(_text_field(inner_x, inner_y, inner_width, inner_height, font_dots, 'C')([item.get('content', '')])[0])
+        elif item_type == 'text':
+            dynamic(item.get('name'), _text_field(inner_x, inner_y, inner_width, inner_height, font_dots, 'L'))
+        elif item_type == 'barcode_text':
+            dynamic(item.get('name'), _barcode_field(inner_x, inner_y, inner_width, inner_height, font_dots))
+        elif item_type == 'qrcode':
+            dynamic(item.get('name'), _qr_field(inner_x, inner_y, inner_width, inner_height))
+
+    static('^XZ\n')
+    return merge_static_parts(plan)
+
+
+def iter_zpl(parquet_path, template_rows, indices=None, dpi=203, width_mm=100):
+    """
+    Kaynak Parquet'in seçili satırları (None ise tümü) için ZPL komutlarını RENDER_BATCH_ROWS
+    satırlık parçalar halinde üretir; çıktı tek bir dosya olarak yazıcıya gönderilebilir.
+    """
+    plan = compile_zpl(template_rows, dpi, width_mm)
+    parquet_file = pq.ParquetFile(parquet_path)
+    available = data_columns(parquet_file)
+    columns = [name for name in plan_columns(plan) if name in available]
+    if indices is None:
+        tables = parquet_file.iter_batches(batch_size=RENDER_BATCH_ROWS, columns=columns)
+    else:
+        tables = iter_take_rows(parquet_file, indices, RENDER_BATCH_ROWS, columns=columns)
+    chunks = (''.join(render_labels(plan, prepare_batch(plan, table), table.num_rows)) for table in tables)
+    yield from timed_batches('zpl_render', chunks, lambda chunk: (chunk.count('^XZ'), len(chunk)))